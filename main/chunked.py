@@ -0,0 +1,245 @@
+# Out-of-core (chunked) version of the outlier filtering and aggregation in data.py
+import os
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+CONDITION_COLUMNS = ['size', 'distance', 'direction']
+MEASURE_COLUMNS = ['time_ms', 'errors', 'distance_traveled']
+
+
+class PartialAggregate:
+    """Mergeable count / mean / sum-of-squared-deviations per group.
+
+    Each chunk is reduced with one vectorized groupby, and partial results
+    are combined with the pairwise (Chan et al.) update, so memory depends
+    on the number of groups rather than the number of trials.
+
+    Parameters:
+        keys (list): Grouping columns
+        columns (list): Measures to aggregate
+    """
+    def __init__(self, keys, columns=MEASURE_COLUMNS):
+        self.keys = list(keys)
+        self.columns = list(columns)
+        self.n = None
+        self.mean = None
+        self.m2 = None
+
+    def add_chunk(self, chunk):
+        if len(chunk) == 0:
+            return self
+        grouped = chunk.groupby(self.keys, sort=False, observed=True)[self.columns]
+        n = grouped.size()
+        mean = grouped.mean()
+        m2 = grouped.var(ddof=0).mul(n, axis=0)
+        return self._merge(n, mean, m2)
+
+    def merge(self, other):
+        """Fold another PartialAggregate over disjoint rows into this one."""
+        if other.n is None:
+            return self
+        return self._merge(other.n, other.mean, other.m2)
+
+    def _merge(self, n, mean, m2):
+        if self.n is None:
+            self.n, self.mean, self.m2 = n.astype(float), mean, m2
+            return self
+
+        index = self.n.index.union(n.index)
+        n_a = self.n.reindex(index, fill_value=0)
+        n_b = n.reindex(index, fill_value=0).astype(float)
+        mean_a = self.mean.reindex(index, fill_value=0)
+        mean_b = mean.reindex(index, fill_value=0)
+        total = n_a + n_b
+
+        delta = mean_b - mean_a
+        self.mean = mean_a + delta.mul(n_b / total, axis=0)
+        self.m2 = (self.m2.reindex(index, fill_value=0) + m2.reindex(index, fill_value=0)
+                   + (delta ** 2).mul(n_a * n_b / total, axis=0))
+        self.n = total
+        return self
+
+    def std(self, ddof=1):
+        """Per-group standard deviation (NaN where n <= ddof, like pandas)."""
+        denominator = (self.n - ddof).where(self.n > ddof)
+        return np.sqrt(self.m2.div(denominator, axis=0))
+
+
+def iter_participant_chunks(data_dir="data", chunksize=None):
+    """Yield trial DataFrames in row batches of `chunksize`, or file by file.
+
+    Batches are filled across file boundaries, so the number of batches (and
+    of aggregate merges) follows the number of rows rather than the number of
+    sessions. At most about two batches' worth of rows is held at once.
+    """
+    files = glob.glob(os.path.join(data_dir, "fitts_law_*.csv"))
+    if chunksize is None:
+        for filename in files:
+            chunk = pd.read_csv(filename)
+            chunk['participant_id'] = os.path.basename(filename).split('_')[2].split('.')[0]
+            yield chunk
+        return
+
+    buffered, rows = [], 0
+    for filename in files:
+        participant_id = os.path.basename(filename).split('_')[2].split('.')[0]
+        for piece in pd.read_csv(filename, chunksize=chunksize):
+            piece['participant_id'] = participant_id
+            buffered.append(piece)
+            rows += len(piece)
+            while rows >= chunksize:
+                batch = pd.concat(buffered, ignore_index=True)
+                yield batch.iloc[:chunksize]
+                rest = batch.iloc[chunksize:]
+                buffered, rows = ([rest] if len(rest) else []), len(rest)
+    if buffered:
+        yield pd.concat(buffered, ignore_index=True)
+
+
+def filter_chunk(chunk, condition_stats, column='time_ms', z_threshold=3):
+    """Apply remove_outliers' per-condition z-score rule to one chunk.
+
+    Parameters:
+        chunk (DataFrame): Trials to filter
+        condition_stats (DataFrame): Per-condition 'mean' and population
+            'std' of `column`, indexed by (size, distance, direction)
+    """
+    lookup = condition_stats.reindex(pd.MultiIndex.from_frame(chunk[CONDITION_COLUMNS]))
+    z_scores = np.abs((chunk[column].to_numpy() - lookup['mean'].to_numpy())
+                      / lookup['std'].to_numpy())
+    return chunk[z_scores < z_threshold]
+
+
+def chunked_analysis(data_dir="data", column='time_ms', z_threshold=3, chunksize=50000):
+    """Run outlier removal, metrics and report data without loading all trials.
+
+    Makes two streaming passes over the CSVs: the first collects per-condition
+    means and standard deviations for the z-score filter, the second filters
+    each chunk and folds it into partial aggregates. Gives the same metrics_df
+    and report numbers as the in-memory path.
+
+    Parameters:
+        data_dir (str): Directory containing the participant CSV files
+        column (str): Measure used for outlier detection
+        z_threshold (float): Z-score cut-off, as in remove_outliers
+        chunksize (int): Rows per batch; None reads one file at a time
+
+    Returns:
+        tuple: (metrics_df, report_data), or (None, None) if there is no data
+    """
+    # Pass 1: per-condition distribution of the outlier column
+    condition_moments = PartialAggregate(CONDITION_COLUMNS, [column])
+    total = 0
+    for chunk in iter_participant_chunks(data_dir, chunksize):
+        condition_moments.add_chunk(chunk)
+        total += len(chunk)
+
+    if total == 0:
+        print("No data files found in the 'data' directory.")
+        return None, None
+
+    # scipy.stats.zscore uses the population standard deviation
+    condition_stats = pd.DataFrame({
+        'mean': condition_moments.mean[column],
+        'std': condition_moments.std(ddof=0)[column]
+    })
+
+    # Pass 2: filter and aggregate
+    aggregates = {
+        'condition': PartialAggregate(CONDITION_COLUMNS),
+        'participant_id': PartialAggregate(['participant_id']),
+        'direction': PartialAggregate(['direction']),
+        'size': PartialAggregate(['size']),
+        'distance': PartialAggregate(['distance']),
+        'overall': PartialAggregate(['_all'])
+    }
+    kept = 0
+    for chunk in iter_participant_chunks(data_dir, chunksize):
+        filtered = filter_chunk(chunk, condition_stats, column, z_threshold).assign(_all=0)
+        kept += len(filtered)
+        for aggregate in aggregates.values():
+            aggregate.add_chunk(filtered)
+
+    removed_count = total - kept
+    print(f"Removed {removed_count} outliers ({removed_count/total*100:.1f}% of data).")
+
+    metrics_df = metrics_from_aggregate(aggregates['condition'])
+    report_data = report_from_aggregates(aggregates, metrics_df)
+    return metrics_df, report_data
+
+
+def metrics_from_aggregate(condition_aggregate):
+    """Build the calculate_fitts_metrics() table from per-condition moments."""
+    means = condition_aggregate.mean.add_suffix('_mean')
+    stds = condition_aggregate.std().add_suffix('_std')
+    grouped = pd.concat([means, stds], axis=1).sort_index().reset_index()
+    grouped['ID'] = np.log2(grouped['distance'] / grouped['size'] + 1)
+    grouped['IP'] = grouped['ID'] / (grouped['time_ms_mean'] / 1000)
+    return grouped
+
+
+def report_from_aggregates(aggregates, metrics_df):
+    """Build the generate_report_data() dictionary from partial aggregates."""
+    overall = aggregates['overall']
+    overall_stats = {
+        'total_participants': len(aggregates['participant_id'].n),
+        'total_trials': int(overall.n.iloc[0]),
+        'mean_movement_time': overall.mean['time_ms'].iloc[0],
+        'mean_error_rate': overall.mean['errors'].iloc[0],
+        'mean_distance_traveled': overall.mean['distance_traveled'].iloc[0]
+    }
+
+    slope, intercept, r_value, p_value, std_err = stats.linregress(
+        metrics_df['ID'], metrics_df['time_ms_mean'])
+    regression_stats = {
+        'slope': slope,
+        'intercept': intercept,
+        'r_squared': r_value**2,
+        'throughput': 1000 / slope
+    }
+
+    def factor_stats(name):
+        return aggregates[name].mean[['time_ms', 'errors']].sort_index()
+
+    participant_means = aggregates['participant_id'].mean.sort_index()
+    time_means = participant_means['time_ms']
+    error_means = participant_means['errors']
+    participant_stats = {
+        'fastest_participant': time_means.idxmin(),
+        'slowest_participant': time_means.idxmax(),
+        'most_accurate_participant': error_means.idxmin(),
+        'least_accurate_participant': error_means.idxmax(),
+        'time_variation': time_means.std() / time_means.mean() * 100,
+        'error_variation': error_means.std() / (error_means.mean() + 0.001) * 100
+    }
+
+    return {
+        'overall_stats': overall_stats,
+        'regression_stats': regression_stats,
+        'direction_stats': factor_stats('direction'),
+        'size_stats': factor_stats('size'),
+        'distance_stats': factor_stats('distance'),
+        'participant_stats': participant_stats
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunked Fitts' Law analysis")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--chunksize", type=int, default=50000,
+                        help="rows per batch (0 reads one file at a time)")
+    parser.add_argument("--z-threshold", type=float, default=3)
+    args = parser.parse_args()
+
+    metrics_df, report_data = chunked_analysis(args.data_dir, z_threshold=args.z_threshold,
+                                               chunksize=args.chunksize or None)
+    if metrics_df is not None:
+        print(f"Generated metrics for {len(metrics_df)} configurations.")
+        print("\n=== Key Findings ===")
+        print(f"Fitts' Law Correlation (R²): {report_data['regression_stats']['r_squared']:.4f}")
+        print(f"Throughput: {report_data['regression_stats']['throughput']:.2f} bits/second")
+        print(f"Average Movement Time: {report_data['overall_stats']['mean_movement_time']:.1f} ms")
+        print(f"Average Error Rate: {report_data['overall_stats']['mean_error_rate']:.2f} errors per trial")
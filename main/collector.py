@@ -0,0 +1,463 @@
+# Multi-station trial collection over TCP
+#
+# Stations running fitslaw.py stream each completed trial to one aggregation
+# server, which stages them in fitts_law_<participant_id>.csv.partial in the
+# shared data directory. When the station reports the session complete the
+# file is renamed to the fitts_law_<participant_id>.csv that data.py reads;
+# a station whose participant quits or declines asks for it to be deleted.
+#
+# Wire protocol: newline-delimited JSON.
+#   station -> server: {"participant_id": "...", "seq": 1, "trial": {...}}
+#                      {"participant_id": "...", "control": "complete", "trials": 180}
+#                      {"participant_id": "...", "control": "discard"}
+#   server -> station: {"participant_id": "...", "ack": 1}   (or "complete"/"discard")
+#                      {"participant_id": "...", "reject": 1, "reason": "..."}
+# "seq" is the 1-based trial number and doubles as the idempotency key, so a
+# station may resend anything it has not seen acknowledged. A trial is only
+# acknowledged once it is on disk; trials that fail validation are rejected
+# and never stored.
+import os
+import re
+import csv
+import json
+import glob
+import math
+import queue
+import asyncio
+import argparse
+import threading
+
+from ingest import DIRECTIONS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+FIELDNAMES = ['trial', 'size', 'distance', 'direction',
+              'time_ms', 'distance_traveled', 'errors']
+# fitslaw.py uses the first 8 characters of a uuid4 as the participant id
+PARTICIPANT_ID_PATTERN = re.compile(r'[0-9a-f]{8}')
+
+
+INT16_MAX = 2 ** 15 - 1
+INT8_MAX = 2 ** 7 - 1
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _is_count(value, low, high):
+    return _is_number(value) and value % 1 == 0 and low <= value <= high
+
+
+def validate_message(participant_id, seq, trial):
+    """Check an incoming trial against the CSV schema.
+
+    Applies the same rules (and reasons) as ingest.validate_trials, with
+    plain Python checks so that validation stays cheap on the event loop.
+
+    Returns:
+        tuple: (row dict ready for the CSV, None) or (None, rejection reason)
+    """
+    if not PARTICIPANT_ID_PATTERN.fullmatch(participant_id):
+        return None, 'invalid participant id'
+    if not isinstance(trial, dict):
+        return None, 'trial is not an object'
+    row = {name: trial.get(name) for name in FIELDNAMES}
+    row['trial'] = seq
+    checks = [
+        ('invalid trial number', _is_count(seq, 1, INT16_MAX)),
+        ('invalid target size', _is_count(row['size'], 1, INT16_MAX)),
+        ('invalid target distance', _is_count(row['distance'], 1, INT16_MAX)),
+        ('unknown direction', row['direction'] in DIRECTIONS),
+        ('invalid movement time', _is_number(row['time_ms']) and row['time_ms'] > 0),
+        ('invalid distance traveled', _is_number(row['distance_traveled'])
+         and row['distance_traveled'] >= 0),
+        ('invalid error count', _is_count(row['errors'], 0, INT8_MAX)),
+    ]
+    for reason, ok in checks:
+        if not ok:
+            return None, reason
+    return row, None
+
+
+class CollectionServer:
+    """Asyncio server that batches incoming trials into the shared dataset.
+
+    Trials are staged per participant in a .partial file that only becomes
+    part of the dataset once the station reports the session complete.
+
+    Parameters:
+        data_dir (str): Directory holding the fitts_law_<id>.csv files
+        batch_size (int): Flush as soon as this many trials are buffered
+        flush_interval (float): Flush at least this often (seconds)
+    """
+    def __init__(self, data_dir="data", batch_size=64, flush_interval=0.25):
+        self.data_dir = data_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._waiting = {}  # buffered key -> stations to acknowledge once written
+        self._seen = self._load_seen()
+        self._discarded = set()
+        self._flush_lock = asyncio.Lock()
+        self._server = None
+        self._flusher = None
+        self._stations = {}  # connection writer -> its handler task
+
+    def _path(self, participant_id, partial=True):
+        filename = os.path.join(self.data_dir, f"fitts_law_{participant_id}.csv")
+        return filename + ".partial" if partial else filename
+
+    def _load_seen(self):
+        """Rebuild the set of stored (participant, trial) keys from disk."""
+        seen = set()
+        for filename in glob.glob(os.path.join(self.data_dir, "fitts_law_*.csv")) + \
+                glob.glob(os.path.join(self.data_dir, "fitts_law_*.csv.partial")):
+            participant_id = os.path.basename(filename).split('_')[2].split('.')[0]
+            with open(filename, newline='') as f:
+                for row in csv.DictReader(f):
+                    seen.add((participant_id, int(row['trial'])))
+        return seen
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening; returns the bound (host, port)."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._server = await asyncio.start_server(self._handle_station, host, port)
+        self._flusher = asyncio.create_task(self._flush_periodically())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """Stop accepting stations and write out anything still buffered."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+        if self._server is not None:
+            self._server.close()
+        await self.flush()
+        if self._buffer:
+            print(f"{len(self._buffer)} trials could not be written; stations will resend them")
+        handlers = list(self._stations.values())
+        for writer in list(self._stations):
+            writer.close()
+        # Let the station handlers see the closed connections and exit
+        await asyncio.gather(*handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        bound = await self.start(host, port)
+        print(f"Collecting trials on {bound[0]}:{bound[1]} into '{self.data_dir}'")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_station(self, reader, writer):
+        self._stations[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    participant_id = str(message['participant_id'])
+                    if 'control' in message:
+                        await self._control(writer, participant_id, message)
+                        continue
+                    seq = int(message['seq'])
+                    trial = message['trial']
+                except (ValueError, KeyError, TypeError):
+                    print(f"Ignoring malformed message: {line[:80]!r}")
+                    continue
+
+                key = (participant_id, seq)
+                if key in self._seen:
+                    # Already stored (a resend after a lost ack): acknowledge again
+                    self._ack(writer, participant_id, seq)
+                    continue
+                if key in self._waiting:
+                    # Resend of a trial that is not on disk yet: acknowledge after the write
+                    self._waiting[key].append(writer)
+                    continue
+
+                row, reason = validate_message(participant_id, seq, trial)
+                if participant_id in self._discarded:
+                    row, reason = None, 'session discarded'
+                if row is None:
+                    print(f"Rejecting trial {seq} of '{participant_id[:40]}': {reason}")
+                    self._reject(writer, participant_id, seq, reason)
+                    continue
+
+                self._waiting[key] = [writer]
+                self._buffer.append((participant_id, seq, row))
+                if len(self._buffer) >= self.batch_size:
+                    await self.flush()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._stations.pop(writer, None)
+            writer.close()
+
+    async def _control(self, writer, participant_id, message):
+        """Finish a session: publish ('complete') or delete ('discard') its trials."""
+        action = message['control']
+        if action not in ('complete', 'discard') or not PARTICIPANT_ID_PATTERN.fullmatch(participant_id):
+            print(f"Ignoring control message: {message!r:.80}")
+            return
+        # Everything the station sent before this message has been buffered
+        if not await self.flush():
+            return  # not acknowledged, so the station will ask again
+        partial_path = self._path(participant_id)
+        try:
+            if action == 'complete':
+                if os.path.exists(partial_path):
+                    os.replace(partial_path, self._path(participant_id, partial=False))
+                stored = sum(1 for key in self._seen if key[0] == participant_id)
+                if stored != message.get('trials', stored):
+                    print(f"Session {participant_id} complete with {stored} of "
+                          f"{message['trials']} trials (the rest were rejected)")
+            else:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                self._seen = {key for key in self._seen if key[0] != participant_id}
+                self._discarded.add(participant_id)
+        except OSError as exc:
+            print(f"Could not {action} session {participant_id}: {exc}")
+            return
+        self._ack(writer, participant_id, action)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as exc:
+                print(f"Periodic flush failed: {exc}")
+
+    async def flush(self):
+        """Append buffered trials to disk, then acknowledge them.
+
+        Returns:
+            bool: False if the write failed; the batch stays buffered
+                (unacknowledged) and is retried on the next flush
+        """
+        async with self._flush_lock:
+            if not self._buffer:
+                return True
+            batch, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except OSError as exc:
+                print(f"Could not write {len(batch)} trials, will retry: {exc}")
+                self._buffer = batch + self._buffer
+                return False
+            for participant_id, seq, _ in batch:
+                key = (participant_id, seq)
+                self._seen.add(key)
+                for writer in self._waiting.pop(key, []):
+                    self._ack(writer, participant_id, seq)
+            return True
+
+    def _write_batch(self, batch):
+        by_participant = {}
+        for participant_id, seq, row in batch:
+            by_participant.setdefault(participant_id, []).append((seq, row))
+
+        for participant_id, rows in by_participant.items():
+            filename = self._path(participant_id)
+            is_new = not os.path.exists(filename)
+            with open(filename, 'a', newline='') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+                if is_new:
+                    writer.writeheader()
+                for _, row in sorted(rows, key=lambda r: r[0]):
+                    writer.writerow(row)
+
+    @staticmethod
+    def _ack(writer, participant_id, seq):
+        if writer.is_closing():
+            return
+        ack = {'participant_id': participant_id, 'ack': seq}
+        writer.write((json.dumps(ack) + "\n").encode('utf-8'))
+
+    @staticmethod
+    def _reject(writer, participant_id, seq, reason):
+        if writer.is_closing():
+            return
+        reply = {'participant_id': participant_id, 'reject': seq, 'reason': reason}
+        writer.write((json.dumps(reply) + "\n").encode('utf-8'))
+
+
+class TrialStreamClient:
+    """Background sender used by a station to stream its trials.
+
+    send() only enqueues, so the experiment's trial loop never waits on the
+    network. A worker thread owns the connection, resends everything that
+    has not been acknowledged after a reconnect, and keeps unacknowledged
+    trials in a local spool file so nothing is lost if the station exits
+    while the server is unreachable. Spooled trials are picked up again the
+    next time a client starts with the same data directory.
+
+    Parameters:
+        host (str): Collection server host
+        port (int): Collection server port
+        spool_dir (str): Directory for the local spool file
+        retry_interval (float): Seconds between reconnection attempts
+    """
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, spool_dir="data", retry_interval=1.0):
+        self.host = host
+        self.port = port
+        self.retry_interval = retry_interval
+        self.spool_path = os.path.join(spool_dir, ".collector_spool.jsonl")
+        self._outbox = queue.Queue()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._closing = threading.Event()
+        self._load_spool()
+        self._thread = threading.Thread(target=self._run, name="trial-stream", daemon=True)
+        self._thread.start()
+
+    def send(self, participant_id, seq, trial):
+        """Queue one completed trial for delivery (never blocks)."""
+        self._outbox.put({'participant_id': participant_id, 'seq': seq, 'trial': trial})
+
+    def complete(self, participant_id, trials):
+        """Report the session finished so the server publishes its trials."""
+        self._outbox.put({'participant_id': participant_id, 'control': 'complete', 'trials': trials})
+
+    def discard(self, participant_id):
+        """Withdraw an unfinished session: drop its unsent trials and ask the
+        server to delete the ones it already stored."""
+        with self._pending_lock:
+            self._pending = {key: message for key, message in self._pending.items()
+                             if key[0] != participant_id}
+            queued = []
+            while not self._outbox.empty():
+                queued.append(self._outbox.get_nowait())
+            for message in queued:
+                if message['participant_id'] != participant_id:
+                    self._outbox.put(message)
+        self._outbox.put({'participant_id': participant_id, 'control': 'discard'})
+
+    def close(self, timeout=5.0):
+        """Try to deliver outstanding trials, then spool whatever is left.
+
+        Returns:
+            int: Number of trials still unacknowledged (now in the spool file)
+        """
+        self._closing.set()
+        self._thread.join(timeout)
+        with self._pending_lock:
+            remaining = list(self._pending.values())
+        while not self._outbox.empty():
+            remaining.append(self._outbox.get_nowait())
+        self._write_spool(remaining)
+        return len(remaining)
+
+    def _load_spool(self):
+        if not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path) as f:
+            for line in f:
+                if line.strip():
+                    message = json.loads(line)
+                    self._pending[self._key(message)] = message
+
+    def _write_spool(self, messages):
+        if not messages:
+            if os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+            return
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(self.spool_path, 'w') as f:
+            for message in messages:
+                f.write(json.dumps(message) + "\n")
+
+    @staticmethod
+    def _key(message):
+        """Pending key: (participant, seq) for trials, (participant, action) for control messages."""
+        return (message['participant_id'], message.get('control', message.get('seq')))
+
+    def _run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                if self._closing.is_set():
+                    return
+                await asyncio.sleep(self.retry_interval)
+                continue
+
+            try:
+                with self._pending_lock:
+                    resend = list(self._pending.values())
+                for message in resend:
+                    writer.write((json.dumps(message) + "\n").encode('utf-8'))
+                await writer.drain()
+
+                ack_task = asyncio.create_task(self._read_acks(reader))
+                while not ack_task.done() and not writer.is_closing():
+                    sent = False
+                    while not self._outbox.empty() and not writer.is_closing():
+                        with self._pending_lock:
+                            if self._outbox.empty():
+                                break
+                            message = self._outbox.get_nowait()
+                            self._pending[self._key(message)] = message
+                        writer.write((json.dumps(message) + "\n").encode('utf-8'))
+                        sent = True
+                    if sent:
+                        await writer.drain()
+                    if self._closing.is_set() and self._outbox.empty():
+                        with self._pending_lock:
+                            if not self._pending:
+                                ack_task.cancel()
+                                writer.close()
+                                return
+                    await asyncio.sleep(0.02)
+            except (OSError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+            if self._closing.is_set():
+                return
+            await asyncio.sleep(self.retry_interval)
+
+    async def _read_acks(self, reader):
+        while True:
+            try:
+                line = await reader.readline()
+            except ConnectionError:
+                return
+            if not line:
+                return
+            reply = json.loads(line)
+            if 'reject' in reply:
+                # Resending would be rejected again; drop it and say why
+                print(f"Server rejected trial {reply['reject']}: {reply.get('reason')}")
+                seq = reply['reject']
+            else:
+                seq = reply['ack']
+            with self._pending_lock:
+                self._pending.pop((reply['participant_id'], seq), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fitts' Law trial collection server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(CollectionServer(args.data_dir).serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Collection server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,18 +5,23 @@ import matplotlib.pyplot as plt
 from scipy import stats
 import math
 import glob
+from pipeline import Pipeline, CACHE_DIR
+from ingest import load_compact_participant_data
+from dataset import as_frame
+from learning import exclude_warmup
 
 def export_results_to_text(df, metrics_df, output_dir="results"):
     """Export detailed numerical results to a text file.
     
     Parameters:
-        df (DataFrame): The filtered data with all trials
+        df (DataFrame or FittsDataset): The filtered data with all trials
         metrics_df (DataFrame): The calculated Fitts' Law metrics
         output_dir (str): Directory to save the results file
     
     Returns:
         str: Path to the created text file
     """
+    df = as_frame(df)
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
@@ -132,7 +137,7 @@ def export_results_to_text(df, metrics_df, output_dir="results"):
         f.write("-------------- | -------------- | ----------- | ------------------\n")
         
         # Calculate participant stats
-        participant_stats = df.groupby('participant_id').agg({
+        participant_stats = df.groupby('participant_id', observed=True).agg({
             'time_ms': 'mean',
             'errors': 'mean',
             'distance_traveled': 'mean'
@@ -168,8 +173,9 @@ def load_participant_data(data_dir="data"):
 
 def remove_outliers(df, column='time_ms', z_threshold=3):
     """Remove outliers from the dataset based on z-score."""
+    df = as_frame(df)
     # Group data by configuration
-    grouped = df.groupby(['size', 'distance', 'direction'])
+    grouped = df.groupby(['size', 'distance', 'direction'], observed=True)
     
     # Function to remove outliers within each group
     def filter_outliers(group):
@@ -187,15 +193,16 @@ def remove_outliers(df, column='time_ms', z_threshold=3):
 
 def calculate_fitts_metrics(df):
     """Calculate ID and IP for Fitts' Law analysis."""
+    df = as_frame(df)
     # Group by configuration and calculate means
-    grouped_means = df.groupby(['size', 'distance', 'direction']).agg({
+    grouped_means = df.groupby(['size', 'distance', 'direction'], observed=True).agg({
         'time_ms': 'mean',
         'errors': 'mean',
         'distance_traveled': 'mean'
     }).reset_index()
     
     # Calculate standard deviations
-    grouped_std = df.groupby(['size', 'distance', 'direction']).agg({
+    grouped_std = df.groupby(['size', 'distance', 'direction'], observed=True).agg({
         'time_ms': 'std',
         'errors': 'std',
         'distance_traveled': 'std'
@@ -256,7 +263,7 @@ def generate_fitts_plots(metrics_df, output_dir="results"):
     plt.figure(figsize=(12, 6))
     
     # Group by ID and direction
-    direction_grouped = metrics_df.groupby(['ID', 'direction']).agg({
+    direction_grouped = metrics_df.groupby(['ID', 'direction'], observed=True).agg({
         'time_ms_mean': 'mean'
     }).reset_index()
     
@@ -267,7 +274,11 @@ def generate_fitts_plots(metrics_df, output_dir="results"):
     pivot_df.plot(kind='bar', figsize=(12, 6))
     plt.xlabel('Index of Difficulty (bits)')
     plt.ylabel('Movement Time (ms)')
-    plt.title('Movement Time Comparison: Left vs Right Direction')
+    directions = [str(direction).title() for direction in pivot_df.columns]
+    if len(directions) > 1:
+        plt.title(f"Movement Time Comparison: {' vs '.join(directions)} Direction")
+    else:
+        plt.title(f"Movement Time by Index of Difficulty ({directions[0]} Task)")
     plt.grid(True, axis='y', alpha=0.3)
     plt.tight_layout()
     
@@ -297,11 +308,12 @@ def generate_fitts_plots(metrics_df, output_dir="results"):
 
 def generate_participant_comparison(df, output_dir="results"):
     """Generate plots comparing participant performance."""
+    df = as_frame(df)
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
     # Calculate mean stats for each participant
-    participant_stats = df.groupby('participant_id').agg({
+    participant_stats = df.groupby('participant_id', observed=True).agg({
         'time_ms': 'mean',
         'errors': 'mean',
         'distance_traveled': 'mean'
@@ -340,6 +352,7 @@ def generate_participant_comparison(df, output_dir="results"):
 
 def export_to_excel(df, metrics_df, output_dir="results"):
     """Export processed data to Excel for further analysis."""
+    df = as_frame(df)
     os.makedirs(output_dir, exist_ok=True)
     
     # Create Excel writer
@@ -351,7 +364,7 @@ def export_to_excel(df, metrics_df, output_dir="results"):
         metrics_df.to_excel(writer, sheet_name='Configuration Metrics', index=False)
         
         # Participant summary
-        participant_summary = df.groupby('participant_id').agg({
+        participant_summary = df.groupby('participant_id', observed=True).agg({
             'time_ms': ['mean', 'std', 'min', 'max'],
             'errors': ['mean', 'sum'],
             'distance_traveled': ['mean', 'std']
@@ -378,42 +391,70 @@ def export_to_excel(df, metrics_df, output_dir="results"):
     
     return os.path.join(output_dir, 'fitts_law_analysis.xlsx')
 
-def main():
-    """Main function to run the analysis."""
-    print("Loading participant data...")
-    df = load_participant_data()
+def build_pipeline(data_dir="data", output_dir="results", z_threshold=3, cache_dir=CACHE_DIR,
+                   typed=False, warmup_trials=None):
+    """Describe the analysis as a graph of cached stages.
     
-    if df is None:
-        print("No data found. Please run the experiment first.")
-        return
-    
-    print(f"Loaded data from {df['participant_id'].nunique()} participants with {len(df)} total trials.")
-    
-    # Remove outliers
-    print("\nRemoving outliers...")
-    filtered_df = remove_outliers(df)
+    Parameters:
+        data_dir (str): Directory containing the participant CSV files
+        output_dir (str): Directory for plots, workbook and text report
+        z_threshold (float): Z-score cut-off used by remove_outliers
+        cache_dir (str): Directory holding the stage cache
+        typed (bool): Load through the schema-validating compact loader
+            (ingest.load_typed_data) instead of load_participant_data
+        warmup_trials (int or 'auto'): Practice trials to drop from each
+            participant before outlier removal (learning.exclude_warmup)
     
-    # Calculate Fitts' Law metrics
-    print("\nCalculating Fitts' Law metrics...")
-    metrics_df = calculate_fitts_metrics(filtered_df)
-    print(f"Generated metrics for {len(metrics_df)} configurations.")
+    Returns:
+        Pipeline: The configured pipeline, ready to run
+    """
+    pipeline = Pipeline(cache_dir)
+    loader = load_compact_participant_data if typed else load_participant_data
+    pipeline.add('load', loader, params={'data_dir': data_dir},
+                 inputs=lambda: glob.glob(os.path.join(data_dir, "fitts_law_*.csv")))
+    source = 'load'
+    if warmup_trials:
+        pipeline.add('practiced', exclude_warmup, deps=['load'],
+                     params={'trials': warmup_trials})
+        source = 'practiced'
+    pipeline.add('filtered', remove_outliers, deps=[source],
+                 params={'z_threshold': z_threshold})
+    pipeline.add('metrics', calculate_fitts_metrics, deps=['filtered'])
+    pipeline.add('fitts_plots', generate_fitts_plots, deps=['metrics'],
+                 params={'output_dir': output_dir},
+                 outputs=[os.path.join(output_dir, name) for name in
+                          ('fitts_law_regression.png', 'direction_comparison.png', 'error_rates.png')])
+    pipeline.add('participant_plot', generate_participant_comparison, deps=['filtered'],
+                 params={'output_dir': output_dir}, outputs=True)
+    pipeline.add('excel', export_to_excel, deps=['filtered', 'metrics'],
+                 params={'output_dir': output_dir}, outputs=True)
+    pipeline.add('text_results', export_results_to_text, deps=['filtered', 'metrics'],
+                 params={'output_dir': output_dir}, outputs=True)
+    pipeline.add('report', generate_report_data, deps=['filtered', 'metrics'])
+    return pipeline
+
+def main(use_cache=True, warmup_trials=None):
+    """Main function to run the analysis.
     
-    # Generate plots
-    print("\nGenerating plots...")
-    plot_path = generate_fitts_plots(metrics_df)
-    participant_plot_path = generate_participant_comparison(filtered_df)
+    Stages whose inputs and parameters are unchanged since the last run are
+    read from the stage cache instead of being recomputed. warmup_trials is
+    passed to build_pipeline to leave out each participant's practice trials.
+    """
+    if not glob.glob(os.path.join("data", "fitts_law_*.csv")):
+        print("No data files found in the 'data' directory.")
+        print("No data found. Please run the experiment first.")
+        return
     
-    # Export to Excel
-    print("\nExporting data to Excel...")
-    excel_path = export_to_excel(filtered_df, metrics_df)
-
-    ## Filtered data for detailed results
-    print("\nExporting detailed results to text file...")
-    text_results_path = export_results_to_text(filtered_df, metrics_df)
+    print("Running analysis pipeline...")
+    results = build_pipeline(warmup_trials=warmup_trials).run(
+        targets=['fitts_plots', 'participant_plot', 'excel', 'text_results', 'report'],
+        force=not use_cache)
     
-    # Generate report data
-    print("\nGenerating report data...")
-    report_data = generate_report_data(filtered_df, metrics_df)
+    plot_path = results['fitts_plots']
+    participant_plot_path = results['participant_plot']
+    excel_path = results['excel']
+    text_results_path = results['text_results']
+    report_data = results['report']
     
     # Print key findings
     print("\n=== Key Findings ===")
@@ -422,12 +463,14 @@ def main():
     print(f"Average Movement Time: {report_data['overall_stats']['mean_movement_time']:.1f} ms")
     print(f"Average Error Rate: {report_data['overall_stats']['mean_error_rate']:.2f} errors per trial")
     
-    # Direction comparison
-    left_time = report_data['direction_stats'].loc['left', 'time_ms']
-    right_time = report_data['direction_stats'].loc['right', 'time_ms']
-    dir_diff_pct = abs(left_time - right_time) / min(left_time, right_time) * 100
-    
-    print(f"\nDirection Difference: {dir_diff_pct:.1f}% (Left: {left_time:.1f} ms, Right: {right_time:.1f} ms)")
+    # Direction comparison (ring-task data has no left/right trials)
+    direction_stats = report_data['direction_stats']
+    if 'left' in direction_stats.index and 'right' in direction_stats.index:
+        left_time = direction_stats.loc['left', 'time_ms']
+        right_time = direction_stats.loc['right', 'time_ms']
+        dir_diff_pct = abs(left_time - right_time) / min(left_time, right_time) * 100
+        
+        print(f"\nDirection Difference: {dir_diff_pct:.1f}% (Left: {left_time:.1f} ms, Right: {right_time:.1f} ms)")
     
     # Participant variation
     print(f"\nParticipant Variation in Movement Time: {report_data['participant_stats']['time_variation']:.1f}% CV")
@@ -441,6 +484,7 @@ def main():
 
 def generate_report_data(df, metrics_df):
     """Generate summary data for the report."""
+    df = as_frame(df)
     # Overall summary statistics
     overall_stats = {
         'total_participants': df['participant_id'].nunique(),
@@ -462,25 +506,25 @@ def generate_report_data(df, metrics_df):
     }
     
     # Direction comparison
-    direction_stats = df.groupby('direction').agg({
+    direction_stats = df.groupby('direction', observed=True).agg({
         'time_ms': 'mean',
         'errors': 'mean'
     })
     
     # Size comparison
-    size_stats = df.groupby('size').agg({
+    size_stats = df.groupby('size', observed=True).agg({
         'time_ms': 'mean',
         'errors': 'mean'
     })
     
     # Distance comparison
-    distance_stats = df.groupby('distance').agg({
+    distance_stats = df.groupby('distance', observed=True).agg({
         'time_ms': 'mean',
         'errors': 'mean'
     })
     
     # Participant variability 
-    participant_var = df.groupby('participant_id').agg({
+    participant_var = df.groupby('participant_id', observed=True).agg({
         'time_ms': ['mean', 'std'],
         'errors': 'mean',
         'distance_traveled': 'mean'
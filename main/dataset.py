@@ -0,0 +1,126 @@
+# Indexed, cached view over the combined trial dataset
+import pandas as pd
+
+# Leading keys of each sorted view; ties within a view keep trial order
+VIEW_KEYS = {
+    'participant': ['participant_id', 'size', 'distance', 'direction'],
+    'condition': ['size', 'distance', 'direction', 'participant_id'],
+    'direction': ['direction', 'size', 'distance', 'participant_id'],
+}
+
+
+def _prefix_length(keys, wanted):
+    """Number of leading keys that have a requested value."""
+    length = 0
+    for key in keys:
+        if wanted[key] is None:
+            break
+        length += 1
+    return length
+
+
+def as_frame(data):
+    """Return the plain DataFrame behind a FittsDataset (or the DataFrame itself)."""
+    if isinstance(data, FittsDataset):
+        return data.frame
+    return data
+
+
+class FittsDataset:
+    """Trial data with sorted multi-indexed views and cached derived frames.
+
+    The trials are stored once. Each view in VIEW_KEYS is only a sorted
+    MultiIndex of its key columns (small integer codes per level) plus the
+    row positions of the trials in that order. A query is answered from the
+    view whose leading keys cover the most of the requested keys, so pandas
+    locates the rows by binary search and the trials are taken by position.
+    A key that is not part of that leading prefix (distance on its own, for
+    example) is matched by scanning the codes of its index level.
+
+    Every function in data.py that takes the trial DataFrame also accepts a
+    FittsDataset.
+
+    Parameters:
+        df (DataFrame): Trials as returned by load_participant_data
+    """
+    def __init__(self, df):
+        self.frame = df.reset_index(drop=True)
+        self._views = {name: self._sorted_view(keys) for name, keys in VIEW_KEYS.items()}
+        self._cache = {}
+
+    def _sorted_view(self, keys):
+        """Sorted MultiIndex over keys and the frame row position of each entry."""
+        columns = keys + ['trial']
+        positions = self.frame[columns].sort_values(columns).index.to_numpy()
+        index = pd.MultiIndex.from_arrays([self.frame[key].take(positions) for key in keys])
+        return keys, index, positions
+
+    @classmethod
+    def from_directory(cls, data_dir="data", typed=False):
+        """Load the participant CSVs (optionally via the typed ingest layer)."""
+        if typed:
+            from ingest import load_compact_participant_data
+            df = load_compact_participant_data(data_dir)
+        else:
+            from data import load_participant_data
+            df = load_participant_data(data_dir)
+        return None if df is None else cls(df)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __repr__(self):
+        return (f"FittsDataset({len(self.frame)} trials, "
+                f"{self.frame['participant_id'].nunique()} participants)")
+
+    @property
+    def participants(self):
+        _, index, _ = self._views['participant']
+        return index.get_level_values('participant_id').unique().tolist()
+
+    def query(self, participant=None, size=None, distance=None, direction=None):
+        """Return the trials matching every given key.
+
+        Example: dataset.query(participant='0ba8fccb', size=20, direction='right')
+
+        Returns:
+            DataFrame: Matching trials with a plain integer index. Results
+                are cached and shared, so copy before modifying them.
+        """
+        wanted = {'participant_id': participant, 'size': size,
+                  'distance': distance, 'direction': direction}
+
+        cache_key = ('query',) + tuple(wanted.values())
+        if cache_key not in self._cache:
+            keys, index, positions = max(self._views.values(),
+                                         key=lambda view: _prefix_length(view[0], wanted))
+            # Trailing unspecified levels are dropped so the lookup is a prefix search
+            levels = [wanted[key] for key in keys]
+            while levels and levels[-1] is None:
+                levels.pop()
+            if not levels:
+                result = self.frame
+            else:
+                locator = tuple(slice(None) if value is None else value for value in levels)
+                try:
+                    rows = index.get_locs(locator)
+                except KeyError:
+                    rows = []
+                result = self.frame.take(positions[rows]).reset_index(drop=True)
+            self._cache[cache_key] = result
+        return self._cache[cache_key]
+
+    def filtered(self, column='time_ms', z_threshold=3):
+        """Outlier-filtered dataset (remove_outliers), computed once per setting."""
+        cache_key = ('filtered', column, z_threshold)
+        if cache_key not in self._cache:
+            from data import remove_outliers
+            self._cache[cache_key] = FittsDataset(remove_outliers(self.frame, column, z_threshold))
+        return self._cache[cache_key]
+
+    def metrics(self):
+        """calculate_fitts_metrics() of this dataset, computed once."""
+        if 'metrics' not in self._cache:
+            from data import calculate_fitts_metrics
+            self._cache['metrics'] = calculate_fitts_metrics(self.frame)
+        return self._cache['metrics']
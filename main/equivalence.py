@@ -0,0 +1,333 @@
+# Equivalence and performance checks for the analysis code paths
+#
+# Every optimized path (typed ingest, indexed dataset, chunked and streaming
+# aggregation) must reproduce what the reference in-memory path of data.py
+# computes: the outlier filter, the metrics table, the regression and the
+# report data. Each path is run on the shipped sessions and on a synthetic
+# dataset; results are compared within a tolerance and the runtime and peak
+# memory of every path are recorded. Any mismatch makes the run fail.
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+
+from data import (load_participant_data, remove_outliers, calculate_fitts_metrics,
+                  generate_report_data)
+from ingest import load_compact_participant_data
+from dataset import FittsDataset
+from chunked import chunked_analysis
+from streaming import StreamingFittsStats
+
+CONDITION_COLUMNS = ['size', 'distance', 'direction']
+
+# Published results for the shipped data/ sessions (results/fitts_law_results.txt),
+# compared at the precision they are printed with
+REFERENCE_RESULTS = {
+    'total_trials': (1775, 0),
+    'outliers_removed': (25, 0),
+    'r_squared': (0.8902, 4),
+    'throughput': (6.95, 2),
+    'intercept': (420.59, 2),
+    'slope': (143.87, 2)
+}
+
+SIZES = (20, 40, 60)
+DISTANCES = (100, 200, 300)
+DIRECTIONS = ('left', 'right')
+
+
+def reference_path(data_dir):
+    """data.py as used by main(): load, remove_outliers, metrics, report data."""
+    df = load_participant_data(data_dir)
+    filtered = remove_outliers(df)
+    metrics_df = calculate_fitts_metrics(filtered)
+    return metrics_df, generate_report_data(filtered, metrics_df)
+
+
+def typed_path(data_dir):
+    """Same analysis on the schema-validated, narrow-dtype frame."""
+    df = load_compact_participant_data(data_dir)
+    filtered = remove_outliers(df)
+    metrics_df = calculate_fitts_metrics(filtered)
+    return metrics_df, generate_report_data(filtered, metrics_df)
+
+
+def dataset_path(data_dir):
+    """Same analysis through the indexed FittsDataset and its cached views."""
+    filtered = FittsDataset.from_directory(data_dir).filtered()
+    metrics_df = filtered.metrics()
+    return metrics_df, generate_report_data(filtered, metrics_df)
+
+
+def chunked_path(data_dir, chunksize=5000):
+    """Two-pass chunked aggregation, in batches smaller than the dataset."""
+    return chunked_analysis(data_dir, chunksize=chunksize)
+
+
+def streaming_path(data_dir):
+    """Running statistics fed trial by trial with the reference outlier filter.
+
+    Only the parts the streaming view maintains are returned: the metrics
+    table, overall statistics and the regression.
+    """
+    filtered = remove_outliers(load_participant_data(data_dir))
+    live = StreamingFittsStats.from_dataframe(filtered)
+    summary = live.summary()
+    regression = summary.pop('regression')
+    overall = {key: summary[key] for key in
+               ('total_participants', 'total_trials', 'mean_movement_time', 'mean_error_rate')}
+    return live.metrics(), {
+        'overall_stats': overall,
+        'regression_stats': {key: regression[key] for key in
+                             ('slope', 'intercept', 'r_squared', 'throughput')}
+    }
+
+
+PATHS = {
+    'reference': reference_path,
+    'typed': typed_path,
+    'dataset': dataset_path,
+    'chunked': chunked_path,
+    'streaming': streaming_path
+}
+
+# Report entries each path must produce. None means everything the reference
+# produces (every key, recursively); a dict lists the required keys, each
+# again with None or a nested dict/list. Missing entries count as mismatches.
+REQUIRED_REPORT = {
+    'typed': None,
+    'dataset': None,
+    'chunked': None,
+    'streaming': {
+        'overall_stats': ['total_participants', 'total_trials',
+                          'mean_movement_time', 'mean_error_rate'],
+        'regression_stats': None
+    }
+}
+
+
+def _normalize_frame(frame):
+    """Plain, sorted frame so results from different paths can be compared."""
+    frame = frame.reset_index()
+    if 'index' in frame.columns:
+        frame = frame.drop(columns='index')
+    for column in frame.columns:
+        if not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].astype(str)
+        else:
+            frame[column] = frame[column].astype(float)
+    keys = [column for column in CONDITION_COLUMNS + ['participant_id'] if column in frame.columns]
+    if not keys:
+        keys = list(frame.columns[:1])
+    return frame.sort_values(keys).reset_index(drop=True)
+
+
+def compare_results(expected, actual, rtol=1e-6, atol=1e-9, path='result', required=None):
+    """Recursively compare a path's result with the reference result.
+
+    Parameters:
+        required (dict, list or None): Keys that `actual` must contain (see
+            REQUIRED_REPORT); None requires every key of `expected`
+
+    Returns:
+        list: Human-readable descriptions of every mismatch, including
+            required keys that are missing and keys the reference lacks
+    """
+    if isinstance(expected, dict):
+        if not isinstance(actual, dict):
+            return [f"{path}: expected a dict, got {type(actual).__name__}"]
+        if required is None:
+            required = dict.fromkeys(expected)
+        elif isinstance(required, (list, tuple)):
+            required = dict.fromkeys(required)
+        mismatches = [f"{path}.{key}: missing" for key in required if key not in actual]
+        for key, value in actual.items():
+            if key not in expected:
+                mismatches.append(f"{path}.{key}: not produced by the reference path")
+            else:
+                mismatches += compare_results(expected[key], value, rtol, atol, f"{path}.{key}",
+                                              required.get(key))
+        return mismatches
+
+    if isinstance(expected, (pd.DataFrame, pd.Series)):
+        expected = _normalize_frame(expected.to_frame() if isinstance(expected, pd.Series) else expected)
+        actual = _normalize_frame(actual.to_frame() if isinstance(actual, pd.Series) else actual)
+        try:
+            pd.testing.assert_frame_equal(expected, actual[expected.columns], check_dtype=False,
+                                          check_exact=False, rtol=rtol, atol=atol)
+        except (AssertionError, KeyError) as exc:
+            return [f"{path}: {str(exc).splitlines()[0]}"]
+        return []
+
+    if isinstance(expected, (int, float, np.number)) and not isinstance(expected, bool):
+        if not np.isclose(float(actual), float(expected), rtol=rtol, atol=atol):
+            return [f"{path}: expected {float(expected):.10g}, got {float(actual):.10g}"]
+        return []
+
+    if str(expected) != str(actual):
+        return [f"{path}: expected {expected!r}, got {actual!r}"]
+    return []
+
+
+def check_reference_results(report_data, raw_trials):
+    """Compare the reference path on data/ with the published numbers."""
+    regression = report_data['regression_stats']
+    observed = {
+        'total_trials': report_data['overall_stats']['total_trials'],
+        'outliers_removed': raw_trials - report_data['overall_stats']['total_trials'],
+        'r_squared': regression['r_squared'],
+        'throughput': regression['throughput'],
+        'intercept': regression['intercept'],
+        'slope': regression['slope']
+    }
+    mismatches = []
+    for key, (published, digits) in REFERENCE_RESULTS.items():
+        if round(observed[key], digits) != published:
+            mismatches.append(f"published.{key}: expected {published}, got {observed[key]:.{digits + 2}f}")
+    return mismatches
+
+
+def generate_synthetic_data(data_dir, participants=500, trials_per_condition=10, seed=0):
+    """Write participant CSVs that follow Fitts' law, with a heavy right tail.
+
+    Each participant has their own intercept and slope; a small fraction of
+    trials is several times slower so outlier removal has work to do.
+
+    Returns:
+        int: Number of trials written
+    """
+    rng = np.random.default_rng(seed)
+    conditions = [(s, d, direction) for s in SIZES for d in DISTANCES for direction in DIRECTIONS]
+    n = len(conditions) * trials_per_condition
+    os.makedirs(data_dir, exist_ok=True)
+    for p in range(participants):
+        order = rng.permutation(np.repeat(np.arange(len(conditions)), trials_per_condition))
+        size = np.array([conditions[i][0] for i in order])
+        distance = np.array([conditions[i][1] for i in order])
+        direction = np.array([conditions[i][2] for i in order])
+        index_of_difficulty = np.log2(distance / size + 1)
+        time_ms = rng.normal(420, 60) + rng.normal(145, 25) * index_of_difficulty + rng.normal(0, 80, n)
+        slow = rng.random(n) < 0.01
+        time_ms[slow] *= rng.uniform(2, 4, slow.sum())
+        pd.DataFrame({
+            'trial': np.arange(1, n + 1),
+            'size': size,
+            'distance': distance,
+            'direction': direction,
+            'time_ms': np.maximum(time_ms, 50),
+            'distance_traveled': distance * rng.uniform(1.0, 1.6, n),
+            'errors': rng.poisson(0.15, n)
+        }).to_csv(os.path.join(data_dir, f"fitts_law_{p:08x}.csv"), index=False)
+    return participants * n
+
+
+def measure(func, data_dir, repeat=1):
+    """Run one path quietly; return its result, best runtime and peak traced memory.
+
+    Runtime is the best of `repeat` untraced runs; peak memory comes from a
+    separate run under tracemalloc, which slows allocation-heavy code down.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        try:
+            result = func(data_dir)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        runtimes = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(data_dir)
+            runtimes.append(time.perf_counter() - start)
+    return result, min(runtimes), peak
+
+
+def run_suite(label, data_dir, paths, rtol, repeat=1, published=False):
+    """Run every path on one dataset and compare it with the reference path.
+
+    Returns:
+        tuple: (records, mismatches) where records has one dict per path
+    """
+    print(f"\n=== {label} ({data_dir}) ===")
+    reference, ref_seconds, ref_peak = measure(PATHS['reference'], data_dir, repeat)
+    records = [{'dataset': label, 'path': 'reference', 'seconds': ref_seconds,
+                'peak_mib': ref_peak / 2**20, 'equivalent': True}]
+    mismatches = []
+
+    if published:
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw_trials = len(load_participant_data(data_dir))
+        found = check_reference_results(reference[1], raw_trials)
+        mismatches += [f"{label}/reference: {m}" for m in found]
+        records[0]['equivalent'] = not found
+
+    for name in paths:
+        if name == 'reference':
+            continue
+        (metrics_df, report_data), seconds, peak = measure(PATHS[name], data_dir, repeat)
+        found = compare_results(reference[0], metrics_df, rtol, path='metrics')
+        found += compare_results(reference[1], report_data, rtol, path='report',
+                                 required=REQUIRED_REPORT.get(name))
+        mismatches += [f"{label}/{name}: {m}" for m in found]
+        records.append({'dataset': label, 'path': name, 'seconds': seconds,
+                        'peak_mib': peak / 2**20, 'equivalent': not found})
+
+    print(f"{'Path':<10} | {'Time (s)':>9} | {'vs ref':>7} | {'Peak (MiB)':>10} | Result")
+    for record in records:
+        print(f"{record['path']:<10} | {record['seconds']:9.3f} | "
+              f"{record['seconds'] / ref_seconds:6.2f}x | {record['peak_mib']:10.1f} | "
+              f"{'ok' if record['equivalent'] else 'MISMATCH'}")
+    return records, mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check optimized analysis paths against the reference")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--paths", nargs='+', choices=sorted(PATHS), default=list(PATHS),
+                        help="paths to compare with the reference")
+    parser.add_argument("--synthetic-participants", type=int, default=500,
+                        help="size of the synthetic dataset (0 skips it)")
+    parser.add_argument("--rtol", type=float, default=1e-5,
+                        help="relative tolerance (float32 storage in the typed path needs ~1e-6)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path (best is kept)")
+    parser.add_argument("--output", default=os.path.join("results", "equivalence.json"))
+    args = parser.parse_args(argv)
+
+    records, mismatches = [], []
+    if os.path.isdir(args.data_dir):
+        found = run_suite('shipped', args.data_dir, args.paths, args.rtol, args.repeat, published=True)
+        records += found[0]
+        mismatches += found[1]
+    else:
+        print(f"No '{args.data_dir}' directory; skipping the shipped sessions.")
+
+    if args.synthetic_participants:
+        with tempfile.TemporaryDirectory() as synthetic_dir:
+            trials = generate_synthetic_data(synthetic_dir, args.synthetic_participants)
+            found = run_suite(f'synthetic-{trials}', synthetic_dir, args.paths, args.rtol, args.repeat)
+            records += found[0]
+            mismatches += found[1]
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'rtol': args.rtol, 'records': records, 'mismatches': mismatches}, f, indent=2)
+    print(f"\nRuntime and memory records saved to: {args.output}")
+
+    if mismatches:
+        print(f"\n{len(mismatches)} mismatch(es):")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        return 1
+    print("All paths match the reference.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,11 @@ import time
 import csv
 import uuid
 import os
+import argparse
 from pygame.locals import *
+from collector import TrialStreamClient
+from targets import TargetIndex, ring_positions, iso_sequence, place_distractors, check_ring_layout
+from trajectory_store import TrajectoryWriter
 
 # Constants
 SCREEN_WIDTH = 800
@@ -25,10 +29,49 @@ TARGET_DISTANCES = [100, 200, 300]
 DIRECTIONS = ["left", "right"]
 TRIALS_PER_CONFIG = 10
 
+# Multidirectional (ISO 9241-9) ring task: target distance is the ring diameter
+RING_TARGETS = 13
+# Ring diameters (the movement amplitude) for the ring task. TARGET_DISTANCES
+# are too small for 13 distinct targets: at 100 px adjacent centers would be
+# only 24 px apart. These keep even 60 px targets separate and fit the screen.
+RING_DIAMETERS = [300, 400, 500]
+DISTRACTOR_SIZE = 30
+
+# Frame rate used by the standard render mode and as the vsync-mode fallback
+DEFAULT_FRAME_RATE = 60
+
 class FittsLawExperiment:
-    def __init__(self):
+    def __init__(self, server=None, task="standard", ring_targets=RING_TARGETS, distractors=0,
+                 render_mode="standard", refresh_rate=None):
+        if task == "ring":
+            # Refuse layouts whose ring targets would overlap
+            iso_sequence(ring_targets)
+            for size in TARGET_SIZES:
+                for diameter in RING_DIAMETERS:
+                    check_ring_layout(size, diameter, ring_targets)
         pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        
+        # Display: "standard" draws at a fixed 60 FPS; "vsync" matches the
+        # monitor refresh rate and times trials from the target's first frame
+        self.render_mode = render_mode
+        self.vsync_active = False
+        if render_mode == "vsync":
+            self.refresh_rate = refresh_rate or self.detect_refresh_rate()
+            try:
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT),
+                                                      pygame.SCALED, vsync=1)
+                self.vsync_active = True
+            except pygame.error:
+                print("Vsync is not available, pacing frames with the clock instead")
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        else:
+            self.refresh_rate = DEFAULT_FRAME_RATE
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.frame_budget_ms = 1000 / self.refresh_rate
+        self.last_present_time = None
+        self.frames_presented = 0
+        self.frames_over_budget = 0
+        self.awaiting_onset = False
         pygame.display.set_caption("Fitts' Law Experiment")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, 36)
@@ -39,6 +82,12 @@ class FittsLawExperiment:
         if not os.path.exists("data"):
             os.makedirs("data")
         
+        # Task layout: "standard" (left/right of center) or "ring"
+        self.task = task
+        self.ring_targets = ring_targets
+        self.distractors = distractors
+        self.layouts = {}
+        
         # Experiment state
         self.state = "welcome"  
         self.participant_id = str(uuid.uuid4())[:8]  
@@ -52,10 +101,27 @@ class FittsLawExperiment:
         self.start_pos = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
         self.target_pos = (0, 0)
         self.mouse_path = []
+        self.path_times = []
+        self.clicks = []
+        
+        # Raw trajectories are streamed to a compact file as trials complete.
+        # It keeps a .partial suffix until the session finishes, so an early
+        # exit leaves nothing behind (as promised on the consent screen).
+        self.trajectory_path = f"data/trajectories_{self.participant_id}.ftraj"
+        self.trajectory_writer = TrajectoryWriter(self.trajectory_path + ".partial")
+        
+        # Optional client mode: stream each completed trial to a collection server
+        self.stream_client = None
+        if server is not None:
+            host, port = server
+            self.stream_client = TrialStreamClient(host, port)
         
     def generate_trial_sequence(self):
         """Generate randomized trial sequence for all configurations."""
         self.trials = []
+        if self.task == "ring":
+            self.generate_ring_sequence()
+            return
         # Create all combinations
         for size in TARGET_SIZES:
             for distance in TARGET_DISTANCES:
@@ -69,6 +135,49 @@ class FittsLawExperiment:
         # Shuffle trials
         random.shuffle(self.trials)
     
+    def generate_ring_sequence(self):
+        """Generate ring-task trials: one full ISO selection sequence per condition.
+        
+        Conditions are presented in random order, but each condition's trials
+        stay in sequence order: a trial starts on the previously selected ring
+        target and ends on the next one, so every movement crosses the ring.
+        The first trial of a block starts on the sequence's last target.
+        The recorded distance is the ring diameter (RING_DIAMETERS).
+        """
+        order = iso_sequence(self.ring_targets)
+        conditions = [(size, diameter) for size in TARGET_SIZES for diameter in RING_DIAMETERS]
+        random.shuffle(conditions)
+        for size, diameter in conditions:
+            for k in range(len(order)):
+                self.trials.append({
+                    "size": size,
+                    "distance": diameter,
+                    "direction": "ring",
+                    "start": order[k - 1],
+                    "target": order[k]
+                })
+    
+    def get_layout(self, size, distance):
+        """Return (ring positions, distractor positions, TargetIndex) for a condition.
+        
+        Layouts are built once per condition and reused, so each click only
+        costs one index lookup however many targets are on screen.
+        """
+        key = (size, distance)
+        if key not in self.layouts:
+            center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+            positions = ring_positions(center, distance, self.ring_targets)
+            distractors = place_distractors(
+                self.distractors, DISTRACTOR_SIZE,
+                avoid=[(x, y, size) for x, y in positions] + [(center[0], center[1], 30)],
+                bounds=(DISTRACTOR_SIZE, 60, SCREEN_WIDTH - DISTRACTOR_SIZE,
+                        SCREEN_HEIGHT - DISTRACTOR_SIZE))
+            targets = [(i, pos, size, 'ring') for i, pos in enumerate(positions)]
+            targets += [(len(positions) + i, pos, DISTRACTOR_SIZE, 'distractor')
+                        for i, pos in enumerate(distractors)]
+            self.layouts[key] = (positions, distractors, TargetIndex(targets))
+        return self.layouts[key]
+    
     def setup_trial(self):
         """Setup a new trial with current configuration."""
         trial_config = self.trials[self.current_trial]
@@ -80,19 +189,71 @@ class FittsLawExperiment:
         center_x = SCREEN_WIDTH // 2
         center_y = SCREEN_HEIGHT // 2
         
-        if self.current_direction == "left":
-            target_x = center_x - self.current_distance
+        if self.task == "ring":
+            self.ring_layout, self.distractor_layout, self.target_index = \
+                self.get_layout(self.current_size, self.current_distance)
+            self.start_id = trial_config["start"]
+            self.target_id = trial_config["target"]
+            self.start_pos = self.ring_layout[self.start_id]
+            self.target_pos = self.ring_layout[self.target_id]
         else:
-            target_x = center_x + self.current_distance
-        
-        self.target_pos = (target_x, center_y)
-        self.start_pos = (center_x, center_y)
+            if self.current_direction == "left":
+                target_x = center_x - self.current_distance
+            else:
+                target_x = center_x + self.current_distance
+            
+            self.target_pos = (target_x, center_y)
+            self.start_pos = (center_x, center_y)
         
         # Reset trial variables
         self.errors = 0
-        self.mouse_path = [(center_x, center_y)]  
+        self.mouse_path = [self.start_pos]  
+        self.path_times = [0.0]
+        self.clicks = []
         self.waiting_for_center_click = True
-        
+        # Other screens flip outside present_frame(); don't count the gap
+        # since the last trial frame as one long frame
+        self.last_present_time = None
+        
+    def detect_refresh_rate(self):
+        """Return the desktop refresh rate in Hz, or the default if unknown."""
+        get_rates = getattr(pygame.display, "get_desktop_refresh_rates", None)
+        if get_rates is not None:
+            rates = [rate for rate in get_rates() if rate > 0]
+            if rates:
+                return rates[0]
+        return DEFAULT_FRAME_RATE
+    
+    def present_frame(self):
+        """Flip the display and return the time the frame was presented.
+        
+        With vsync the flip returns once the buffer swap has happened, so the
+        returned timestamp is when the frame actually reached the screen (to
+        within the display's scan-out). Frames arriving later than one refresh
+        interval after the previous one are counted as over budget.
+        """
+        pygame.display.flip()
+        present_time = time.perf_counter()
+        if self.last_present_time is not None:
+            interval_ms = (present_time - self.last_present_time) * 1000
+            if interval_ms > 1.5 * self.frame_budget_ms:
+                self.frames_over_budget += 1
+        self.last_present_time = present_time
+        self.frames_presented += 1
+        return present_time
+    
+    def mark_target_onset(self, onset_time):
+        """Re-reference the trial clock to the frame on which the target appeared.
+        
+        Samples already recorded since the start click get negative times, so
+        the start click itself shows the click-to-onset latency.
+        """
+        shift_ms = (onset_time - self.start_time) * 1000
+        self.path_times = [t_ms - shift_ms for t_ms in self.path_times]
+        self.clicks = [(t_ms - shift_ms, x, y, event) for t_ms, x, y, event in self.clicks]
+        self.start_time = onset_time
+        self.awaiting_onset = False
+    
     def calculate_distance_traveled(self):
         """Calculate the total distance traveled by the mouse during the trial."""
         total_distance = 0
@@ -111,6 +272,19 @@ class FittsLawExperiment:
         distance = math.sqrt((x - target_x)**2 + (y - target_y)**2)
         return distance <= self.current_size / 2
     
+    def is_start_hit(self, pos):
+        """Check if the given position is on the start circle of the trial."""
+        if self.task == "ring":
+            return self.target_index.contains(self.start_id, pos)
+        center_x, center_y = self.start_pos
+        return math.sqrt((pos[0] - center_x)**2 + (pos[1] - center_y)**2) <= 15
+    
+    def classify_click(self, pos):
+        """Classify a click during movement: 'hit', 'miss', 'wrong_target' or 'distractor'."""
+        if self.task == "ring":
+            return self.target_index.classify(pos, self.target_id)
+        return 'hit' if self.is_target_hit(pos) else 'miss'
+    
     def save_data(self):
         """Save all trial data to a CSV file."""
         filename = f"data/fitts_law_{self.participant_id}.csv"
@@ -131,6 +305,26 @@ class FittsLawExperiment:
                     'errors': data['errors']
                 })
         print(f"Data saved to {filename}")
+        self.save_trajectories()
+    
+    def save_trajectories(self):
+        """Finish the trajectory file written during the session.
+        
+        Each sample is one of: 'move' for pointer motion, 'hit' for the final
+        click and 'miss', 'wrong_target' or 'distractor' for errors. t_ms is
+        measured from the click on the start circle, or in vsync render mode
+        from target onset, with a 'start' sample for the start click.
+        """
+        self.trajectory_writer.close()
+        os.replace(self.trajectory_path + ".partial", self.trajectory_path)
+        print(f"Trajectories saved to {self.trajectory_path}")
+    
+    def discard_trajectories(self):
+        """Drop the partial trajectory file of an unfinished session."""
+        partial_path = self.trajectory_path + ".partial"
+        self.trajectory_writer.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
     
     def draw_welcome_screen(self):
         """Draw the welcome screen."""
@@ -267,10 +461,10 @@ class FittsLawExperiment:
         self.screen.blit(title, title_rect)
         
         instructions = [
-            "1. For each trial, first click the blue circle in the center.",
+            "1. For each trial, first click the blue circle.",
             "2. Then, as quickly as possible, click the red target that appears.",
             "3. Try to be both fast and accurate.",
-            "4. You will complete 180 trials in total.",
+            f"4. You will complete {len(self.trials)} trials in total.",
             "",
             "Press ESC at any time to exit the experiment.",
             "",
@@ -292,8 +486,14 @@ class FittsLawExperiment:
         progress = self.font.render(f"Trial: {self.current_trial + 1}/{len(self.trials)}", True, BLACK)
         self.screen.blit(progress, (20, 20))
         
-        # Draw center starting point
-        if self.waiting_for_center_click:
+        # Draw center starting point (ring task: start on the previous target)
+        if self.task == "ring":
+            self.draw_ring_targets()
+            if self.waiting_for_center_click:
+                pygame.draw.circle(self.screen, BLUE, self.start_pos, self.current_size // 2)
+            else:
+                pygame.draw.circle(self.screen, RED, self.target_pos, self.current_size // 2)
+        elif self.waiting_for_center_click:
             pygame.draw.circle(self.screen, BLUE, self.start_pos, 15)
         else:
             pygame.draw.circle(self.screen, GRAY, self.start_pos, 15)
@@ -301,7 +501,17 @@ class FittsLawExperiment:
             # Draw target
             pygame.draw.circle(self.screen, RED, self.target_pos, self.current_size // 2)
         
-        pygame.display.flip()
+        present_time = self.present_frame()
+        if self.awaiting_onset:
+            self.mark_target_onset(present_time)
+    
+    def draw_ring_targets(self):
+        """Draw the inactive ring targets and any distractors."""
+        radius = self.current_size // 2
+        for pos in self.ring_layout:
+            pygame.draw.circle(self.screen, GRAY, pos, radius, 2)
+        for pos in self.distractor_layout:
+            pygame.draw.circle(self.screen, GRAY, pos, DISTRACTOR_SIZE // 2)
     
     def draw_feedback_screen(self):
         """Draw feedback after a trial."""
@@ -372,19 +582,31 @@ class FittsLawExperiment:
                 
                 elif self.state == "trial":
                     if self.waiting_for_center_click:
-                        # Check if clicked on the center circle
-                        center_x, center_y = self.start_pos
-                        if math.sqrt((mouse_pos[0] - center_x)**2 + (mouse_pos[1] - center_y)**2) <= 15:
+                        # Check if clicked on the start circle
+                        if self.is_start_hit(mouse_pos):
                             self.waiting_for_center_click = False
-                            self.start_time = time.time()
+                            self.start_time = time.perf_counter()
                             # Clear mouse path and start fresh
                             self.mouse_path = [self.start_pos]
+                            self.path_times = [0.0]
+                            if self.render_mode == "vsync":
+                                # MT starts when the target frame is presented
+                                self.clicks = [(0.0, mouse_pos[0], mouse_pos[1], 'start')]
+                                self.awaiting_onset = True
                     else:
                         # Check if clicked on the target
-                        if self.is_target_hit(mouse_pos):
-                            end_time = time.time()
+                        click_type = self.classify_click(mouse_pos)
+                        if click_type == 'hit':
+                            end_time = time.perf_counter()
                             trial_time_ms = (end_time - self.start_time) * 1000
                             distance_traveled = self.calculate_distance_traveled()
+                            self.clicks.append((trial_time_ms, mouse_pos[0], mouse_pos[1], 'hit'))
+                            
+                            # Keep the raw path for trajectory analysis
+                            samples = [(t_ms, x, y, 'move') for t_ms, (x, y)
+                                       in zip(self.path_times, self.mouse_path)]
+                            samples.extend(self.clicks)
+                            samples.sort(key=lambda sample: sample[0])
                             
                             # Save trial data
                             self.trial_data.append({
@@ -395,10 +617,17 @@ class FittsLawExperiment:
                                 'distance_traveled': distance_traveled,
                                 'errors': self.errors
                             })
+                            self.trajectory_writer.write_trial(len(self.trial_data), samples,
+                                                               self.target_pos)
+                            if self.stream_client is not None:
+                                self.stream_client.send(self.participant_id, len(self.trial_data),
+                                                        self.trial_data[-1])
                             
                             self.state = "feedback"
                         else:
                             self.errors += 1
+                            self.clicks.append(((time.perf_counter() - self.start_time) * 1000,
+                                                mouse_pos[0], mouse_pos[1], click_type))
                 
                 elif self.state == "feedback":
                     self.current_trial += 1
@@ -407,6 +636,8 @@ class FittsLawExperiment:
                         self.setup_trial()
                     else:
                         self.save_data()
+                        if self.stream_client is not None:
+                            self.stream_client.complete(self.participant_id, len(self.trial_data))
                         self.state = "completion"
                 
                 elif self.state == "completion":
@@ -416,6 +647,7 @@ class FittsLawExperiment:
             if self.state == "trial" and not self.waiting_for_center_click:
                 if event.type == MOUSEMOTION:
                     self.mouse_path.append(pygame.mouse.get_pos())
+                    self.path_times.append((time.perf_counter() - self.start_time) * 1000)
             # Handle mouse wheel scrolling for consent screen
             if self.state == "consent" and event.type == pygame.MOUSEWHEEL:
                 total_lines = 39  
@@ -444,11 +676,54 @@ class FittsLawExperiment:
                 self.draw_completion_screen()
             
             running = self.handle_events()
-            self.clock.tick(60)
-        
+            if self.vsync_active:
+                # The vsync'd flip already paces the loop at the refresh rate
+                self.clock.tick()
+            else:
+                self.clock.tick(self.refresh_rate)
+        
+        if self.render_mode == "vsync" and self.frames_presented:
+            print(f"Rendered trial frames at {self.refresh_rate} Hz; "
+                  f"{self.frames_over_budget}/{self.frames_presented} exceeded the "
+                  f"{self.frame_budget_ms:.1f} ms frame budget")
+        if self.state != "completion":
+            self.discard_trajectories()
+            if self.stream_client is not None and self.trial_data:
+                # The consent form promises an unfinished session is not kept
+                self.stream_client.discard(self.participant_id)
+        if self.stream_client is not None:
+            unsent = self.stream_client.close()
+            if unsent:
+                print(f"{unsent} trials could not be delivered and were spooled for the next session")
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    experiment = FittsLawExperiment()
+    parser = argparse.ArgumentParser(description="Fitts' Law experiment")
+    parser.add_argument("--server", metavar="HOST:PORT",
+                        help="stream trials to a collection server (see collector.py)")
+    parser.add_argument("--task", choices=["standard", "ring"], default="standard",
+                        help="left/right targets or the ISO 9241-9 multidirectional ring")
+    parser.add_argument("--ring-targets", type=int, default=RING_TARGETS,
+                        help="number of targets on the ring (odd)")
+    parser.add_argument("--distractors", type=int, default=0,
+                        help="number of distractor targets in the ring task")
+    parser.add_argument("--render-mode", choices=["standard", "vsync"], default="standard",
+                        help="fixed 60 FPS, or vsync at the display refresh rate with "
+                             "movement time measured from target onset")
+    parser.add_argument("--refresh-rate", type=int, default=None,
+                        help="display refresh rate in Hz when it cannot be detected")
+    args = parser.parse_args()
+    
+    server = None
+    if args.server:
+        host, _, port = args.server.rpartition(":")
+        server = (host or "127.0.0.1", int(port))
+    
+    try:
+        experiment = FittsLawExperiment(server=server, task=args.task,
+                                        ring_targets=args.ring_targets, distractors=args.distractors,
+                                        render_mode=args.render_mode, refresh_rate=args.refresh_rate)
+    except ValueError as exc:
+        parser.error(str(exc))
     experiment.run()
\ No newline at end of file
@@ -0,0 +1,222 @@
+# Trajectory and click-endpoint density heatmaps
+import os
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from matplotlib.patches import Circle
+from trajectory_store import TrajectoryReader, EVENTS
+
+# Screen center used by setup_trial() in fitslaw.py (800x600 window)
+SCREEN_CENTER = (400, 300)
+
+
+def load_trajectories(data_dir="data", trials_df=None):
+    """Load the trajectory files and attach each trial's condition.
+
+    Parameters:
+        data_dir (str): Directory containing trajectories_<id>.ftraj files
+        trials_df (DataFrame): Trial data as returned by load_participant_data;
+            loaded from data_dir when omitted
+
+    Returns:
+        DataFrame: One row per sample with trial conditions, or None
+    """
+    all_files = glob.glob(os.path.join(data_dir, "trajectories_*.ftraj"))
+    if not all_files:
+        print("No trajectory files found in the 'data' directory.")
+        return None
+
+    dfs = []
+    for filename in all_files:
+        participant_id = os.path.basename(filename).split('_')[1].split('.')[0]
+        with TrajectoryReader(filename) as reader:
+            columns = reader.read_all()
+        df = pd.DataFrame({
+            'trial': columns['trial'].astype(np.int32),
+            't_ms': columns['t_ms'].astype(np.float32),
+            'x': columns['x'].astype(np.float32),
+            'y': columns['y'].astype(np.float32),
+            'event': pd.Categorical.from_codes(columns['event'], EVENTS),
+            'target_x': columns['target_x'],
+            'target_y': columns['target_y']
+        })
+        df['participant_id'] = participant_id
+        dfs.append(df)
+    samples = pd.concat(dfs, ignore_index=True)
+
+    if trials_df is None:
+        from data import load_participant_data
+        trials_df = load_participant_data(data_dir)
+    conditions = trials_df[['participant_id', 'trial', 'size', 'distance', 'direction']]
+    return samples.merge(conditions, on=['participant_id', 'trial'], how='inner')
+
+
+def add_target_coordinates(samples):
+    """Add rel_x/rel_y: sample position relative to the trial's target center.
+
+    Uses the recorded target_x/target_y columns when present (required for
+    the ring task); otherwise derives the target from setup_trial()'s
+    left/right placement.
+    """
+    if 'target_x' in samples.columns:
+        target_x = samples['target_x'].to_numpy()
+        target_y = samples['target_y'].to_numpy()
+    else:
+        center_x, center_y = SCREEN_CENTER
+        sign = np.where(samples['direction'].to_numpy() == 'left', -1, 1)
+        target_x = center_x + sign * samples['distance'].to_numpy()
+        target_y = center_y
+    samples['rel_x'] = (samples['x'].to_numpy() - target_x).astype(np.float32)
+    samples['rel_y'] = (samples['y'].to_numpy() - target_y).astype(np.float32)
+    return samples
+
+
+def density_grids(x, y, group_codes, n_groups, extent, bins):
+    """Bin points into one 2D histogram per group in a single pass.
+
+    Parameters:
+        x, y (array): Point coordinates
+        group_codes (array): Integer group of each point, 0..n_groups-1
+        n_groups (int): Number of groups
+        extent (tuple): (x_min, x_max, y_min, y_max)
+        bins (tuple): (nx, ny)
+
+    Returns:
+        ndarray: Counts of shape (n_groups, ny, nx)
+    """
+    x_min, x_max, y_min, y_max = extent
+    nx, ny = bins
+    ix = np.floor((np.asarray(x) - x_min) * (nx / (x_max - x_min))).astype(np.int64)
+    iy = np.floor((np.asarray(y) - y_min) * (ny / (y_max - y_min))).astype(np.int64)
+    inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+
+    flat = (np.asarray(group_codes)[inside] * ny + iy[inside]) * nx + ix[inside]
+    counts = np.bincount(flat, minlength=n_groups * ny * nx)
+    return counts.reshape(n_groups, ny, nx)
+
+
+def render_heatmap_grid(samples, rows, cols, extent, bins, title, path, target_sizes=False):
+    """Draw one density panel per (row, col) combination and save the figure.
+
+    Every panel is a single image artist, so drawing cost depends on the
+    grid resolution, not on how many samples were binned.
+    """
+    row_values = sorted(samples[rows].unique()) if rows else [None]
+    col_values = sorted(samples[cols].unique()) if cols else [None]
+
+    keys = [rows, cols]
+    keys = [k for k in keys if k]
+    if keys:
+        codes = samples.groupby(keys, observed=True).ngroup().to_numpy()
+        group_index = samples[keys].drop_duplicates().sort_values(keys)
+        labels = [tuple(r) for r in group_index.itertuples(index=False)]
+    else:
+        codes = np.zeros(len(samples), dtype=np.int64)
+        labels = [()]
+    grids = density_grids(samples['rel_x'].to_numpy(), samples['rel_y'].to_numpy(),
+                          codes, len(labels), extent, bins)
+    vmax = max(grids.max(), 1)
+
+    fig, axes = plt.subplots(len(row_values), len(col_values),
+                             figsize=(4.5 * len(col_values), 3 * len(row_values)),
+                             squeeze=False, sharex=True, sharey=True)
+    image = None
+    for i, row_value in enumerate(row_values):
+        for j, col_value in enumerate(col_values):
+            ax = axes[i][j]
+            label = tuple(v for v in (row_value, col_value) if v is not None)
+            if label not in labels:
+                ax.set_visible(False)
+                continue
+            grid = grids[labels.index(label)].astype(float)
+            grid[grid == 0] = np.nan
+            image = ax.imshow(grid, origin='upper', extent=(extent[0], extent[1], extent[3], extent[2]),
+                              cmap='magma', norm=LogNorm(vmin=1, vmax=vmax),
+                              aspect='equal' if target_sizes else 'auto',
+                              interpolation='nearest')
+            ax.axvline(0, color='white', lw=0.5, alpha=0.5)
+            ax.axhline(0, color='white', lw=0.5, alpha=0.5)
+            if target_sizes and rows == 'size':
+                ax.add_patch(Circle((0, 0), row_value / 2, fill=False, color='cyan', lw=1))
+            ax.set_title(', '.join(f"{k} {v}" for k, v in zip(keys, label)), fontsize=9)
+            ax.set_facecolor('black')
+
+    for ax in axes[-1]:
+        ax.set_xlabel('x relative to target (px)')
+    for ax in axes[:, 0]:
+        ax.set_ylabel('y relative to target (px)')
+    if image is not None:
+        fig.colorbar(image, ax=axes, label='Samples', shrink=0.8)
+    fig.suptitle(title)
+    fig.savefig(path, dpi=150)
+    plt.close(fig)
+    return path
+
+
+def generate_heatmaps(data_dir="data", output_dir="results", trials_df=None,
+                      trajectory_bins=(240, 60), endpoint_bins=(80, 80)):
+    """Render trajectory and endpoint density heatmaps.
+
+    Produces, for each direction, a figure of per-condition trajectory
+    densities and one of click endpoints (hits and misses), plus a pooled
+    trajectory figure per direction. Coordinates are relative to the target
+    center placed by setup_trial().
+
+    Returns:
+        list: Paths of the saved figures
+    """
+    samples = load_trajectories(data_dir, trials_df)
+    if samples is None or samples.empty:
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    samples = add_target_coordinates(samples)
+
+    max_distance = samples['distance'].max()
+    max_size = samples['size'].max()
+    paths = []
+
+    moves = samples[samples['event'] == 'move']
+    clicks = samples[~samples['event'].isin(['move', 'start'])]
+
+    margin = 60
+    paths.append(render_heatmap_grid(
+        moves, None, 'direction',
+        extent=(-max_distance - margin, max_distance + margin, -2 * margin, 2 * margin),
+        bins=trajectory_bins, title='Mouse trajectories by direction',
+        path=os.path.join(output_dir, 'trajectory_heatmap_direction.png')))
+
+    for direction in sorted(samples['direction'].unique()):
+        if direction == 'left':
+            extent = (-margin, max_distance + margin, -margin, margin)
+        elif direction == 'right':
+            extent = (-max_distance - margin, margin, -margin, margin)
+        else:
+            # Ring task: movements arrive from every angle
+            reach = max_distance + margin
+            extent = (-reach, reach, -reach, reach)
+        paths.append(render_heatmap_grid(
+            moves[moves['direction'] == direction], 'size', 'distance',
+            extent=extent, bins=trajectory_bins,
+            title=f'Mouse trajectories ({direction})',
+            path=os.path.join(output_dir, f'trajectory_heatmap_{direction}.png')))
+
+        reach = max_size * 1.5
+        paths.append(render_heatmap_grid(
+            clicks[clicks['direction'] == direction], 'size', 'distance',
+            extent=(-reach, reach, -reach, reach), bins=endpoint_bins,
+            title=f'Click endpoints ({direction})', target_sizes=True,
+            path=os.path.join(output_dir, f'endpoint_heatmap_{direction}.png')))
+
+    print(f"Rendered {len(paths)} heatmaps from {len(samples)} samples")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trajectory and endpoint heatmaps")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--output-dir", default="results")
+    args = parser.parse_args()
+    generate_heatmaps(args.data_dir, args.output_dir)
@@ -0,0 +1,202 @@
+# Practice and fatigue effects across trial order
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from dataset import as_frame
+
+CONDITION_COLUMNS = ['size', 'distance', 'direction']
+
+
+def add_trial_metrics(df):
+    """Add per-trial ID, throughput and condition-normalized movement time.
+
+    Trials are presented in random order, so raw MT jumps with the condition
+    of each trial. relative_mt divides MT by the pooled mean MT of the
+    trial's condition, which leaves practice and fatigue as the trend.
+    """
+    df = as_frame(df).copy()
+    df['ID'] = np.log2(df['distance'] / df['size'] + 1)
+    df['throughput'] = df['ID'] / (df['time_ms'] / 1000)
+    condition_mean = df.groupby(CONDITION_COLUMNS, observed=True)['time_ms'].transform('mean')
+    df['relative_mt'] = df['time_ms'] / condition_mean
+    df['had_error'] = (df['errors'] > 0).astype(float)
+    return df
+
+
+def rolling_performance(df, window=20, min_periods=5):
+    """Rolling MT, error rate and throughput along each participant's trial order.
+
+    One grouped rolling pass covers all participants.
+
+    Parameters:
+        df (DataFrame or FittsDataset): Trial data
+        window (int): Number of trials in each window
+        min_periods (int): Minimum trials before a value is reported
+
+    Returns:
+        DataFrame: participant_id, trial and the rolling_* columns
+    """
+    trials = add_trial_metrics(df).sort_values(['participant_id', 'trial'])
+    measures = {
+        'time_ms': 'rolling_mt',
+        'relative_mt': 'rolling_relative_mt',
+        'errors': 'rolling_errors',
+        'had_error': 'rolling_error_rate',
+        'throughput': 'rolling_throughput'
+    }
+    rolled = (trials.groupby('participant_id', observed=True)[list(measures)]
+              .rolling(window, min_periods=min_periods).mean()
+              .rename(columns=measures))
+    rolled.index = rolled.index.droplevel(0)
+    result = trials[['participant_id', 'trial']].join(rolled)
+    return result.reset_index(drop=True)
+
+
+def _trial_matrix(trials, column):
+    """Participants x trial-position matrix of a column (NaN where missing)."""
+    matrix = trials.pivot_table(index='participant_id', columns='trial', values=column,
+                                aggfunc='mean', observed=True)
+    return matrix.index, matrix.columns.to_numpy(), matrix.to_numpy(dtype=float)
+
+
+def stabilization_points(df, column='relative_mt', min_segment=10, max_fraction=0.5):
+    """Find where each participant's performance stops changing.
+
+    Fits a two-segment mean-shift model to every participant's series at
+    once: cumulative sums along the trial axis give the squared error of
+    every possible split, and the split with the smallest total error is
+    taken as the changepoint. Only splits in the first max_fraction of the
+    session are considered, so a late (fatigue) shift is not mistaken for
+    the end of practice; late_mean over the last min_segment trials shows
+    any drift after the stable phase.
+
+    Parameters:
+        df (DataFrame or FittsDataset): Trial data
+        column (str): Series to segment (see add_trial_metrics)
+        min_segment (int): Minimum trials on each side of the changepoint
+        max_fraction (float): Latest allowed changepoint, as a fraction of
+            each participant's trials
+
+    Returns:
+        DataFrame: participant_id, stabilization_trial (first trial of the
+            stable segment), warmup_mean, stable_mean, late_mean,
+            improvement_pct (warm-up vs. stable) and fatigue_pct (late vs.
+            stable; positive means slower for relative_mt)
+    """
+    trials = add_trial_metrics(df)
+    participants, trial_numbers, values = _trial_matrix(trials, column)
+
+    present = ~np.isnan(values)
+    x = np.where(present, values, 0.0)
+    zeros = np.zeros((len(values), 1))
+    count = np.hstack([zeros, np.cumsum(present, axis=1)])
+    total = np.hstack([zeros, np.cumsum(x, axis=1)])
+    total_sq = np.hstack([zeros, np.cumsum(x * x, axis=1)])
+
+    # Split after column k (k trials on the left): SSE = sum(x^2) - sum(x)^2 / n per segment
+    n_left, s_left, q_left = count[:, 1:-1], total[:, 1:-1], total_sq[:, 1:-1]
+    n_right = count[:, -1:] - n_left
+    s_right = total[:, -1:] - s_left
+    q_right = total_sq[:, -1:] - q_left
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sse = (q_left - s_left ** 2 / n_left) + (q_right - s_right ** 2 / n_right)
+    too_late = n_left > max_fraction * count[:, -1:]
+    sse[(n_left < min_segment) | (n_right < min_segment) | too_late] = np.inf
+
+    best = np.argmin(sse, axis=1)
+    valid = np.isfinite(sse[np.arange(len(sse)), best])
+    rows = np.arange(len(best))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        warmup_mean = s_left[rows, best] / n_left[rows, best]
+        stable_mean = s_right[rows, best] / n_right[rows, best]
+        # Each participant's own last min_segment trials (series may end early)
+        late_start = np.argmax(count >= count[:, -1:] - min_segment, axis=1)
+        late_mean = (total[:, -1] - total[rows, late_start]) / (count[:, -1] - count[rows, late_start])
+
+    result = pd.DataFrame({
+        'participant_id': np.asarray(participants),
+        'stabilization_trial': np.where(valid, trial_numbers[np.minimum(best + 1, len(trial_numbers) - 1)], np.nan),
+        'warmup_mean': np.where(valid, warmup_mean, np.nan),
+        'stable_mean': np.where(valid, stable_mean, np.nan),
+        'late_mean': late_mean
+    })
+    result['improvement_pct'] = (result['warmup_mean'] - result['stable_mean']) / result['warmup_mean'] * 100
+    result['fatigue_pct'] = (result['late_mean'] - result['stable_mean']) / result['stable_mean'] * 100
+    return result
+
+
+def exclude_warmup(df, trials=None):
+    """Drop warm-up trials before calculate_fitts_metrics().
+
+    Parameters:
+        df (DataFrame or FittsDataset): Trial data
+        trials (int or 'auto'): Drop each participant's first `trials`
+            trials, or with 'auto' everything before that participant's
+            detected stabilization point (only where the warm-up segment
+            was slower). None or 0 keeps every trial.
+
+    Returns:
+        DataFrame: The remaining trials
+    """
+    df = as_frame(df)
+    if not trials:
+        return df
+    if trials == 'auto':
+        points = stabilization_points(df)
+        points = points[points['improvement_pct'] > 0].set_index('participant_id')['stabilization_trial']
+        first_kept = df['participant_id'].map(points).astype(float).fillna(1).to_numpy()
+    else:
+        first_kept = int(trials) + 1
+    kept = df[df['trial'].to_numpy() >= first_kept].reset_index(drop=True)
+    removed = len(df) - len(kept)
+    print(f"Excluded {removed} warm-up trials ({removed/len(df)*100:.1f}% of data).")
+    return kept
+
+
+def plot_learning_curves(df, output_dir="results", window=20):
+    """Plot rolling MT, error rate and throughput against trial number."""
+    os.makedirs(output_dir, exist_ok=True)
+    rolling = rolling_performance(df, window=window)
+    points = stabilization_points(df).set_index('participant_id')['stabilization_trial']
+
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+    panels = [('rolling_relative_mt', 'MT / condition mean'),
+              ('rolling_error_rate', 'Proportion of trials with errors'),
+              ('rolling_throughput', 'Throughput (bits/s)')]
+    for participant_id, group in rolling.groupby('participant_id', observed=True):
+        for ax, (column, _) in zip(axes, panels):
+            line, = ax.plot(group['trial'], group[column], alpha=0.7, label=str(participant_id))
+            if column == 'rolling_relative_mt' and not np.isnan(points.get(participant_id, np.nan)):
+                ax.axvline(points[participant_id], color=line.get_color(), ls=':', alpha=0.5)
+
+    for ax, (_, label) in zip(axes, panels):
+        ax.set_xlabel('Trial')
+        ax.set_ylabel(label)
+        ax.grid(True, alpha=0.3)
+    axes[0].set_title(f'Movement Time ({window}-trial rolling mean)')
+    axes[1].set_title('Error Rate')
+    axes[2].set_title('Throughput')
+    axes[2].legend(fontsize=8, title='Participant')
+
+    plt.tight_layout()
+    path = os.path.join(output_dir, 'learning_curves.png')
+    plt.savefig(path, dpi=300)
+    plt.close(fig)
+    return path
+
+
+if __name__ == "__main__":
+    from data import load_participant_data
+
+    parser = argparse.ArgumentParser(description="Learning-curve and fatigue analysis")
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--output-dir", default="results")
+    args = parser.parse_args()
+
+    df = load_participant_data()
+    if df is not None:
+        print(stabilization_points(df).to_string(index=False))
+        print(f"Learning curves saved to: {plot_learning_curves(df, args.output_dir, args.window)}")
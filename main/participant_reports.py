@@ -0,0 +1,140 @@
+# Parallel per-participant report generation
+import os
+import json
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from dataset import as_frame
+from data import (load_participant_data, remove_outliers, calculate_fitts_metrics,
+                  generate_fitts_plots, export_results_to_text)
+
+MANIFEST_NAME = "manifest.json"
+
+# Filtered dataset shared with worker processes. With the fork start method it
+# is inherited copy-on-write; otherwise each worker receives it once at start.
+_shared_df = None
+
+
+def _init_worker(df):
+    global _shared_df
+    _shared_df = df
+    plt.switch_backend('Agg')
+
+
+def participant_fingerprint(part_df):
+    """Content hash of one participant's (filtered) trials."""
+    row_hashes = pd.util.hash_pandas_object(part_df.reset_index(drop=True), index=False)
+    return hashlib.sha256(row_hashes.to_numpy().tobytes()).hexdigest()
+
+
+def generate_participant_report(participant_id, output_dir):
+    """Write one participant's regression plots and text report.
+
+    Runs inside a worker process and reads that participant's rows from the
+    shared dataset.
+
+    Returns:
+        list: Paths of the files written
+    """
+    part_df = _shared_df[_shared_df['participant_id'] == participant_id]
+    participant_dir = os.path.join(output_dir, str(participant_id))
+    try:
+        metrics_df = calculate_fitts_metrics(part_df)
+        plot_path = generate_fitts_plots(metrics_df, output_dir=participant_dir)
+        text_path = export_results_to_text(part_df, metrics_df, output_dir=participant_dir)
+    finally:
+        # Workers render many reports; don't let figures accumulate
+        plt.close('all')
+    return [plot_path,
+            os.path.join(participant_dir, 'direction_comparison.png'),
+            os.path.join(participant_dir, 'error_rates.png'),
+            text_path]
+
+
+def _load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def generate_participant_reports(df=None, output_dir=os.path.join("results", "participants"),
+                                 workers=None, force=False):
+    """Render an individual report for every participant in a process pool.
+
+    Participants whose filtered trials hash the same as in the previous run,
+    and whose files are still present, are skipped. Each participant is its
+    own task, so a slow or failing report does not hold up the others.
+
+    Parameters:
+        df (DataFrame or FittsDataset): Outlier-filtered trials of all participants; loaded
+            and filtered like data.main() when omitted
+        output_dir (str): Parent directory for the per-participant folders
+        workers (int): Number of worker processes (default: CPU count)
+        force (bool): Re-render every participant
+
+    Returns:
+        dict: participant_id -> list of output paths (or the error message)
+    """
+    if df is None:
+        df = load_participant_data()
+        if df is None:
+            return {}
+        df = remove_outliers(df)
+    df = as_frame(df)
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {} if force else _load_manifest(manifest_path)
+
+    results = {}
+    todo = {}
+    for participant_id, part_df in df.groupby('participant_id', observed=True):
+        participant_id = str(participant_id)
+        fingerprint = participant_fingerprint(part_df)
+        previous = manifest.get(participant_id)
+        if (previous and previous['fingerprint'] == fingerprint
+                and all(os.path.exists(p) for p in previous['outputs'])):
+            results[participant_id] = previous['outputs']
+        else:
+            todo[participant_id] = fingerprint
+
+    print(f"Rendering reports for {len(todo)} of {len(todo) + len(results)} participants "
+          f"({len(results)} unchanged).")
+    if not todo:
+        return results
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(df,)) as pool:
+        futures = {pool.submit(generate_participant_report, participant_id, output_dir): participant_id
+                   for participant_id in todo}
+        for future in as_completed(futures):
+            participant_id = futures[future]
+            try:
+                outputs = future.result()
+            except Exception as exc:
+                print(f"Report for participant {participant_id} failed: {exc}")
+                results[participant_id] = str(exc)
+                manifest.pop(participant_id, None)
+                continue
+            results[participant_id] = outputs
+            manifest[participant_id] = {'fingerprint': todo[participant_id], 'outputs': outputs}
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-participant Fitts' Law reports")
+    parser.add_argument("--output-dir", default=os.path.join("results", "participants"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="re-render every participant")
+    args = parser.parse_args()
+    generate_participant_reports(output_dir=args.output_dir, workers=args.workers, force=args.force)
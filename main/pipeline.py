@@ -0,0 +1,215 @@
+# Incremental, content-addressed execution of the analysis pipeline
+import os
+import ast
+import hashlib
+import inspect
+import pickle
+
+CACHE_DIR = ".fitts_cache"
+
+
+def hash_file(path, chunk_size=1 << 16):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _local_imports(path):
+    """Modules imported anywhere in a source file that live next to it."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    directory = os.path.dirname(path)
+    candidates = (os.path.join(directory, f"{name}.py") for name in names)
+    return [candidate for candidate in candidates if os.path.exists(candidate)]
+
+
+def _source_closure(path):
+    """A source file plus every local module it (transitively) imports."""
+    found = {os.path.abspath(path)}
+    todo = [path]
+    while todo:
+        for imported in _local_imports(todo.pop()):
+            imported = os.path.abspath(imported)
+            if imported not in found:
+                found.add(imported)
+                todo.append(imported)
+    return sorted(found)
+
+
+def _function_fingerprint(func):
+    """Fingerprint a stage function so editing its code invalidates the cache.
+
+    Covers the whole module defining the function and every local module it
+    imports, so edits to helpers the stage calls (not just to the stage
+    function itself) also produce a new key.
+    """
+    digest = hashlib.sha256(getattr(func, '__qualname__', repr(func)).encode('utf-8'))
+    try:
+        path = inspect.getsourcefile(func)
+    except TypeError:
+        path = None
+    if path is None or not os.path.exists(path):
+        return digest.hexdigest()
+    for source in _source_closure(path):
+        digest.update(os.path.basename(source).encode('utf-8'))
+        digest.update(hash_file(source).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Stage:
+    """A single node in the pipeline graph.
+
+    Parameters:
+        name (str): Unique stage name
+        func (callable): Called as func(*dependency_values, **params)
+        deps (list): Names of upstream stages whose values are passed to func
+        params (dict): Keyword arguments for func; part of the cache key
+        inputs (callable): Optional, returns a list of input files whose
+            contents are part of the cache key (used by source stages)
+        outputs (bool or list): True if func writes files and returns their
+            path(s), or the explicit list of files it writes; a cache hit then
+            also requires those files to be unchanged
+    """
+    def __init__(self, name, func, deps=(), params=None, inputs=None, outputs=False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.params = dict(params or {})
+        self.inputs = inputs
+        self.outputs = outputs
+
+
+class Pipeline:
+    """Dependency graph of stages whose results are cached on disk.
+
+    Every stage is keyed by a hash of its code (its module and the local
+    modules it imports), its parameters, the keys of its upstream stages and
+    (for source stages) the contents of its input files. A stage only re-runs when that key has no cache entry, so editing
+    one CSV re-runs the stages downstream of the data while changing nothing
+    re-runs nothing at all.
+    """
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.stages = {}
+        self._keys = {}
+        self._values = {}
+
+    def add(self, name, func, deps=(), params=None, inputs=None, outputs=False):
+        """Register a stage. Dependencies must be added before their dependents."""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already defined")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = Stage(name, func, deps, params, inputs, outputs)
+        return self
+
+    def key(self, name):
+        """Compute (and memoize) the content hash identifying a stage's result."""
+        if name in self._keys:
+            return self._keys[name]
+
+        stage = self.stages[name]
+        digest = hashlib.sha256()
+        digest.update(name.encode('utf-8'))
+        digest.update(_function_fingerprint(stage.func).encode('utf-8'))
+        digest.update(repr(sorted(stage.params.items())).encode('utf-8'))
+        for dep in stage.deps:
+            digest.update(self.key(dep).encode('utf-8'))
+        if stage.inputs is not None:
+            for path in sorted(stage.inputs()):
+                digest.update(os.path.basename(path).encode('utf-8'))
+                digest.update(hash_file(path).encode('utf-8'))
+
+        self._keys[name] = digest.hexdigest()
+        return self._keys[name]
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}-{self.key(name)[:16]}.pkl")
+
+    def _load(self, name):
+        """Return (hit, value) for a stage from the on-disk cache."""
+        path = self._cache_path(name)
+        if not os.path.exists(path):
+            return False, None
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+
+        # File-producing stages are only valid while their outputs are intact
+        files = entry.get('files', {})
+        outputs = self.stages[name].outputs
+        if isinstance(outputs, (list, tuple)) and any(p not in files for p in outputs):
+            return False, None
+        for out_path, out_hash in files.items():
+            if not os.path.exists(out_path) or hash_file(out_path) != out_hash:
+                return False, None
+        return True, entry['value']
+
+    def _store(self, name, value):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {'value': value, 'files': {}}
+        outputs = self.stages[name].outputs
+        if outputs:
+            if isinstance(outputs, (list, tuple)):
+                paths = outputs
+            else:
+                paths = value if isinstance(value, (list, tuple)) else [value]
+            entry['files'] = {p: hash_file(p) for p in paths if p and os.path.exists(p)}
+
+        # Drop superseded entries for this stage before writing the new one
+        prefix = f"{name}-"
+        for old in os.listdir(self.cache_dir):
+            if old.startswith(prefix) and old.endswith('.pkl'):
+                os.remove(os.path.join(self.cache_dir, old))
+
+        tmp_path = self._cache_path(name) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._cache_path(name))
+
+    def _evaluate(self, name, force):
+        if name in self._values:
+            return self._values[name]
+
+        stage = self.stages[name]
+        if not force:
+            hit, value = self._load(name)
+            if hit:
+                print(f"[cached] {name}")
+                self._values[name] = value
+                return value
+
+        dep_values = [self._evaluate(dep, force) for dep in stage.deps]
+        print(f"[running] {name}")
+        value = stage.func(*dep_values, **stage.params)
+        self._store(name, value)
+        self._values[name] = value
+        return value
+
+    def run(self, targets=None, force=False):
+        """Evaluate the requested stages (all by default).
+
+        Parameters:
+            targets (list): Stage names to produce
+            force (bool): Ignore the cache and recompute everything
+
+        Returns:
+            dict: Stage name -> value for every requested target
+        """
+        self._keys = {}
+        self._values = {}
+        if targets is None:
+            targets = list(self.stages)
+        return {name: self._evaluate(name, force) for name in targets}
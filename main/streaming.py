@@ -0,0 +1,334 @@
+# Incremental Fitts' Law statistics, updated one trial at a time
+import os
+import csv
+import glob
+import math
+import time
+import argparse
+import pandas as pd
+
+CONDITION_COLUMNS = ['size', 'distance', 'direction']
+MEASURE_COLUMNS = ['time_ms', 'errors', 'distance_traveled']
+
+
+class RunningStats:
+    """Welford running mean and variance of a single measure."""
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, other):
+        """Combine with another RunningStats (Chan et al. parallel update)."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1, as pandas uses); NaN below two values."""
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+
+class RunningRegression:
+    """Running least-squares fit of y on x using Welford co-moments."""
+    __slots__ = ('n', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy')
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def merge(self, other):
+        """Combine with another RunningRegression over disjoint data."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return self
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.m2_x += other.m2_x + dx * dx * weight
+        self.m2_y += other.m2_y + dy * dy * weight
+        self.c_xy += other.c_xy + dx * dy * weight
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.n = n
+        return self
+
+    def result(self):
+        """Return the current fit as a dict (NaN until it is defined)."""
+        if self.n < 2 or self.m2_x == 0:
+            return {'slope': math.nan, 'intercept': math.nan, 'r_squared': math.nan,
+                    'throughput': math.nan, 'n': self.n}
+        slope = self.c_xy / self.m2_x
+        intercept = self.mean_y - slope * self.mean_x
+        r_squared = self.c_xy ** 2 / (self.m2_x * self.m2_y) if self.m2_y > 0 else math.nan
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'r_squared': r_squared,
+            'throughput': 1000 / slope if slope else math.nan,  # bits/s
+            'n': self.n
+        }
+
+
+def index_of_difficulty(size, distance):
+    """Shannon formulation, ID = log2(A/W + 1), as in calculate_fitts_metrics."""
+    return math.log2(distance / size + 1)
+
+
+class StreamingFittsStats:
+    """O(1)-per-trial running Fitts' Law statistics.
+
+    Keeps Welford accumulators per (size, distance, direction) condition and
+    per participant, so the metrics table, the ID/MT regression and the
+    throughput are available at any moment without revisiting raw trials.
+    The numbers match calculate_fitts_metrics() and generate_report_data()
+    run on the same trials. Outlier removal needs every trial of a condition
+    before it can decide anything, so feed already-filtered trials when the
+    filtered figures are wanted.
+    """
+    def __init__(self):
+        self.n = 0
+        self.overall = {measure: RunningStats() for measure in MEASURE_COLUMNS}
+        self.conditions = {}
+        self.participants = {}
+
+    def update(self, trial, participant_id=None):
+        """Add one trial (a dict or Series with the CSV columns)."""
+        size = int(trial['size'])
+        distance = int(trial['distance'])
+        direction = str(trial['direction'])
+        if participant_id is None:
+            participant_id = trial.get('participant_id')
+        values = [float(trial[measure]) for measure in MEASURE_COLUMNS]
+
+        self.n += 1
+        for measure, value in zip(MEASURE_COLUMNS, values):
+            self.overall[measure].update(value)
+
+        key = (size, distance, direction)
+        condition = self.conditions.get(key)
+        if condition is None:
+            condition = self.conditions[key] = {m: RunningStats() for m in MEASURE_COLUMNS}
+        for measure, value in zip(MEASURE_COLUMNS, values):
+            condition[measure].update(value)
+
+        if participant_id is not None:
+            participant = self.participants.get(participant_id)
+            if participant is None:
+                participant = self.participants[participant_id] = {
+                    'measures': {m: RunningStats() for m in MEASURE_COLUMNS},
+                    'regression': RunningRegression()
+                }
+            for measure, value in zip(MEASURE_COLUMNS, values):
+                participant['measures'][measure].update(value)
+            participant['regression'].update(index_of_difficulty(size, distance), values[0])
+
+    def update_many(self, df):
+        """Feed every row of a DataFrame in order."""
+        for trial in df.to_dict('records'):
+            self.update(trial)
+        return self
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls().update_many(df)
+
+    def metrics(self):
+        """Current metrics table, laid out like calculate_fitts_metrics()."""
+        rows = []
+        for (size, distance, direction), condition in sorted(self.conditions.items()):
+            row = {'size': size, 'distance': distance, 'direction': direction}
+            for measure in MEASURE_COLUMNS:
+                row[f'{measure}_mean'] = condition[measure].mean
+            for measure in MEASURE_COLUMNS:
+                row[f'{measure}_std'] = condition[measure].std
+            rows.append(row)
+
+        columns = CONDITION_COLUMNS + [f'{m}_mean' for m in MEASURE_COLUMNS] + \
+            [f'{m}_std' for m in MEASURE_COLUMNS]
+        metrics_df = pd.DataFrame(rows, columns=columns)
+        metrics_df['ID'] = [index_of_difficulty(s, d) for s, d in
+                            zip(metrics_df['size'], metrics_df['distance'])]
+        metrics_df['IP'] = metrics_df['ID'] / (metrics_df['time_ms_mean'] / 1000)
+        return metrics_df
+
+    def regression(self):
+        """Current ID/MT regression over condition means, as in the report.
+
+        Cost depends on the number of conditions (18 in the standard design),
+        not on the number of trials seen.
+        """
+        fit = RunningRegression()
+        for (size, distance, _), condition in self.conditions.items():
+            fit.update(index_of_difficulty(size, distance), condition['time_ms'].mean)
+        return fit.result()
+
+    def throughput(self):
+        """Current throughput in bits/second (1000 / regression slope)."""
+        return self.regression()['throughput']
+
+    def participant_summary(self):
+        """Per-participant means, MT standard deviation and trial-level fit."""
+        rows = []
+        for participant_id, participant in sorted(self.participants.items()):
+            measures = participant['measures']
+            fit = participant['regression'].result()
+            rows.append({
+                'participant_id': participant_id,
+                'trials': measures['time_ms'].n,
+                'time_ms_mean': measures['time_ms'].mean,
+                'time_ms_std': measures['time_ms'].std,
+                'errors_mean': measures['errors'].mean,
+                'distance_traveled_mean': measures['distance_traveled'].mean,
+                'slope': fit['slope'],
+                'intercept': fit['intercept'],
+                'r_squared': fit['r_squared'],
+                'throughput': fit['throughput']
+            })
+        return pd.DataFrame(rows)
+
+    def summary(self):
+        """Snapshot of the headline numbers printed by data.main()."""
+        return {
+            'total_participants': len(self.participants),
+            'total_trials': self.n,
+            'mean_movement_time': self.overall['time_ms'].mean,
+            'mean_error_rate': self.overall['errors'].mean,
+            'regression': self.regression()
+        }
+
+
+class CsvTailer:
+    """Feed rows appended to the participant CSVs into a StreamingFittsStats.
+
+    Remembers how far into each file it has read, so polling only parses
+    newly written trials (e.g. those appended by collector.py).
+    """
+    def __init__(self, stats, data_dir="data"):
+        self.stats = stats
+        self.data_dir = data_dir
+        self._offsets = {}
+        self._headers = {}
+
+    def poll(self):
+        """Consume any complete new rows; returns how many were added."""
+        added = 0
+        for filename in sorted(glob.glob(os.path.join(self.data_dir, "fitts_law_*.csv"))):
+            participant_id = os.path.basename(filename).split('_')[2].split('.')[0]
+            offset = self._offsets.get(filename, 0)
+            if os.path.getsize(filename) <= offset:
+                continue
+            with open(filename, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+            # Leave a partially written last line for the next poll
+            end = chunk.rfind(b'\n') + 1
+            if end == 0:
+                continue
+            self._offsets[filename] = offset + end
+
+            lines = chunk[:end].decode('utf-8').splitlines()
+            if filename not in self._headers:
+                self._headers[filename] = next(csv.reader([lines[0]]))
+                lines = lines[1:]
+            for row in csv.DictReader(lines, fieldnames=self._headers[filename]):
+                self.stats.update(row, participant_id=participant_id)
+                added += 1
+        return added
+
+
+def live_results_view(data_dir="data", interval=1.0, plot=True):
+    """Continuously refresh the results as new trials are written.
+
+    Parameters:
+        data_dir (str): Directory containing the participant CSV files
+        interval (float): Seconds between polls
+        plot (bool): Show a live ID vs MT plot; otherwise print a status line
+    """
+    stats = StreamingFittsStats()
+    tailer = CsvTailer(stats, data_dir)
+
+    if plot:
+        import matplotlib.pyplot as plt
+        plt.ion()
+        fig, ax = plt.subplots(figsize=(10, 6))
+
+    try:
+        while True:
+            if tailer.poll() and stats.conditions:
+                fit = stats.regression()
+                print(f"{stats.n} trials from {len(stats.participants)} participants | "
+                      f"MT = {fit['intercept']:.2f} + {fit['slope']:.2f} × ID | "
+                      f"R² = {fit['r_squared']:.4f} | Throughput: {fit['throughput']:.2f} bits/second")
+
+                if plot:
+                    metrics_df = stats.metrics()
+                    ax.clear()
+                    ax.scatter(metrics_df['ID'], metrics_df['time_ms_mean'],
+                               s=50, alpha=0.7, c='blue', label='Configurations')
+                    if not math.isnan(fit['slope']):
+                        x_range = pd.Series([metrics_df['ID'].min() - 0.1, metrics_df['ID'].max() + 0.1])
+                        ax.plot(x_range, fit['intercept'] + fit['slope'] * x_range, 'r--',
+                                label=f"y = {fit['slope']:.2f}x + {fit['intercept']:.2f} "
+                                      f"(R² = {fit['r_squared']:.2f})")
+                    ax.set_xlabel('Index of Difficulty (bits)')
+                    ax.set_ylabel('Movement Time (ms)')
+                    ax.set_title(f"Fitts' Law (live): {stats.n} trials")
+                    ax.grid(True, alpha=0.3)
+                    ax.legend()
+
+            if plot:
+                plt.pause(interval)
+            else:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live Fitts' Law results")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--no-plot", action="store_true", help="print status lines only")
+    args = parser.parse_args()
+    live_results_view(args.data_dir, args.interval, plot=not args.no_plot)
@@ -0,0 +1,140 @@
+# Target layouts and constant-time hit testing for the experiment
+import math
+import random
+
+
+def ring_positions(center, diameter, count):
+    """Place `count` target centers evenly on a circle (ISO 9241-9 ring).
+
+    Target 0 is at the top; the rest follow clockwise on screen.
+    """
+    center_x, center_y = center
+    radius = diameter / 2
+    positions = []
+    for i in range(count):
+        angle = 2 * math.pi * i / count - math.pi / 2
+        positions.append((round(center_x + radius * math.cos(angle)),
+                          round(center_y + radius * math.sin(angle))))
+    return positions
+
+
+def ring_spacing(diameter, count):
+    """Distance between the centers of adjacent ring targets."""
+    return diameter * math.sin(math.pi / count)
+
+
+def check_ring_layout(size, diameter, count):
+    """Raise ValueError if targets of this size would touch or overlap on the ring.
+
+    ISO 9241-9 rings need distinct targets, i.e. size < diameter * sin(pi / count).
+    """
+    spacing = ring_spacing(diameter, count)
+    if size >= spacing:
+        raise ValueError(
+            f"{count} targets of {size} px on a {diameter} px ring overlap "
+            f"(adjacent centers are {spacing:.0f} px apart); use a larger ring "
+            f"or fewer targets")
+
+
+def iso_sequence(count):
+    """Order in which ring targets are selected.
+
+    Each step jumps to (roughly) the opposite side of the ring, so every
+    movement spans about one diameter and all directions are covered. With
+    an odd count, stepping by (count + 1) // 2 visits every target once.
+    """
+    if count % 2 == 0:
+        raise ValueError("The ring task needs an odd number of targets")
+    step = (count + 1) // 2
+    return [(i * step) % count for i in range(count)]
+
+
+def place_distractors(count, size, avoid, bounds, min_gap=10, rng=random, max_attempts=1000):
+    """Randomly place `count` distractor centers that overlap nothing in `avoid`.
+
+    Parameters:
+        count (int): Number of distractors
+        size (int): Distractor diameter
+        avoid (list): (x, y, diameter) circles that must stay clear
+        bounds (tuple): (x_min, y_min, x_max, y_max) allowed area for centers
+        min_gap (int): Extra clearance between circles in pixels
+    """
+    x_min, y_min, x_max, y_max = bounds
+    placed = []
+    circles = list(avoid)
+    for _ in range(max_attempts):
+        if len(placed) == count:
+            break
+        x = rng.randint(x_min, x_max)
+        y = rng.randint(y_min, y_max)
+        if all(math.hypot(x - cx, y - cy) > (size + d) / 2 + min_gap for cx, cy, d in circles):
+            placed.append((x, y))
+            circles.append((x, y, size))
+    return placed
+
+
+class TargetIndex:
+    """Uniform-grid spatial index of circular targets.
+
+    Targets are bucketed into square cells at least as large as the biggest
+    target, so any point can only hit targets registered in its own cell.
+    A lookup is one dict access plus a distance check against the few
+    targets in that cell, independent of how many targets are on screen.
+
+    Parameters:
+        targets (list): (target_id, (x, y), diameter, kind) tuples; kind is a
+            free-form label such as 'ring' or 'distractor'
+        cell_size (int): Grid cell size; defaults to the largest diameter
+    """
+    def __init__(self, targets, cell_size=None):
+        self.targets = {target_id: (pos, diameter, kind) for target_id, pos, diameter, kind in targets}
+        if cell_size is None:
+            cell_size = max((diameter for _, diameter, _ in self.targets.values()), default=1)
+        self.cell_size = max(1, int(math.ceil(cell_size)))
+        self.cells = {}
+        for target_id, ((x, y), diameter, _) in self.targets.items():
+            radius = diameter / 2
+            for cx in range(self._cell(x - radius), self._cell(x + radius) + 1):
+                for cy in range(self._cell(y - radius), self._cell(y + radius) + 1):
+                    self.cells.setdefault((cx, cy), []).append(target_id)
+
+    def _cell(self, value):
+        return int(value // self.cell_size)
+
+    def contains(self, target_id, pos):
+        """Check whether pos lies inside the given target."""
+        (tx, ty), diameter, _ = self.targets[target_id]
+        return (pos[0] - tx) ** 2 + (pos[1] - ty) ** 2 <= (diameter / 2) ** 2
+
+    def hit(self, pos):
+        """Return the id of the target containing pos, or None.
+
+        Where targets overlap, the one whose center is nearest wins.
+        """
+        x, y = pos
+        best_id, best_distance = None, None
+        for target_id in self.cells.get((self._cell(x), self._cell(y)), ()):
+            (tx, ty), diameter, _ = self.targets[target_id]
+            distance = (x - tx) ** 2 + (y - ty) ** 2
+            if distance <= (diameter / 2) ** 2 and (best_distance is None or distance < best_distance):
+                best_id, best_distance = target_id, distance
+        return best_id
+
+    def classify(self, pos, active_id):
+        """Classify a click relative to the active target.
+
+        The active target is tested first, so a click inside it is a hit
+        even where it overlaps neighbouring targets.
+
+        Returns:
+            str: 'hit', 'wrong_target' (another ring target), 'distractor',
+                 or 'miss' (empty space)
+        """
+        if self.contains(active_id, pos):
+            return 'hit'
+        target_id = self.hit(pos)
+        if target_id is None:
+            return 'miss'
+        if self.targets[target_id][2] == 'distractor':
+            return 'distractor'
+        return 'wrong_target'
@@ -0,0 +1,95 @@
+# Collection server over localhost: acks, resends, rejects and session staging
+import os
+import csv
+import json
+import asyncio
+
+from collector import CollectionServer, TrialStreamClient
+
+PARTICIPANT = 'abcdef12'
+TRIAL = {'size': 20, 'distance': 100, 'direction': 'left',
+         'time_ms': 512.5, 'distance_traveled': 110.0, 'errors': 0}
+
+
+async def _exchange(port, messages):
+    """Send messages on one connection and collect one reply per message."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for message in messages:
+        writer.write((json.dumps(message) + "\n").encode('utf-8'))
+    await writer.drain()
+    replies = [json.loads(await asyncio.wait_for(reader.readline(), 5)) for _ in messages]
+    writer.close()
+    return replies
+
+
+def _run_session(data_dir, *exchanges):
+    async def main():
+        server = CollectionServer(str(data_dir), flush_interval=0.05)
+        _, port = await server.start('127.0.0.1', 0)
+        try:
+            return [await _exchange(port, messages) for messages in exchanges]
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def _rows(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_acks_duplicates_and_completion(tmp_path):
+    trials = [{'participant_id': PARTICIPANT, 'seq': seq, 'trial': TRIAL} for seq in (1, 2, 1)]
+    first, second = _run_session(
+        tmp_path, trials,
+        [trials[1], {'participant_id': PARTICIPANT, 'control': 'complete', 'trials': 2}])
+
+    # The resent trial 1 is acknowledged again once its batch is on disk
+    assert sorted(reply['ack'] for reply in first) == [1, 1, 2]
+    assert [reply['ack'] for reply in second] == [2, 'complete']
+    rows = _rows(tmp_path / f"fitts_law_{PARTICIPANT}.csv")
+    assert [row['trial'] for row in rows] == ['1', '2']
+    assert not (tmp_path / f"fitts_law_{PARTICIPANT}.csv.partial").exists()
+
+
+def test_invalid_messages_are_rejected(tmp_path):
+    (replies,) = _run_session(tmp_path, [
+        {'participant_id': 'x/../../evil', 'seq': 1, 'trial': TRIAL},
+        {'participant_id': PARTICIPANT, 'seq': 1, 'trial': dict(TRIAL, size='DROP')},
+        {'participant_id': PARTICIPANT, 'seq': 2, 'trial': dict(TRIAL, time_ms=None)},
+        {'participant_id': PARTICIPANT, 'seq': 3, 'trial': TRIAL},
+    ])
+
+    assert [reply.get('reason') for reply in replies[:3]] == \
+        ['invalid participant id', 'invalid target size', 'invalid movement time']
+    assert replies[3] == {'participant_id': PARTICIPANT, 'ack': 3}
+    assert sorted(os.listdir(tmp_path)) == [f"fitts_law_{PARTICIPANT}.csv.partial"]
+
+
+def test_discard_removes_unfinished_session(tmp_path):
+    (replies,) = _run_session(tmp_path, [
+        {'participant_id': PARTICIPANT, 'seq': 1, 'trial': TRIAL},
+        {'participant_id': PARTICIPANT, 'control': 'discard'},
+        {'participant_id': PARTICIPANT, 'seq': 2, 'trial': TRIAL},
+    ])
+
+    assert [reply.get('ack', reply.get('reason')) for reply in replies] == \
+        [1, 'discard', 'session discarded']
+    assert os.listdir(tmp_path) == []
+
+
+def test_client_delivers_and_completes(tmp_path):
+    async def main():
+        server = CollectionServer(str(tmp_path / "server"), flush_interval=0.05)
+        _, port = await server.start('127.0.0.1', 0)
+        client = TrialStreamClient('127.0.0.1', port, spool_dir=str(tmp_path), retry_interval=0.1)
+        for seq in range(1, 21):
+            client.send(PARTICIPANT, seq, TRIAL)
+        client.complete(PARTICIPANT, 20)
+        unsent = await asyncio.to_thread(client.close, 10)
+        await server.stop()
+        return unsent
+
+    assert asyncio.run(main()) == 0
+    assert len(_rows(tmp_path / "server" / f"fitts_law_{PARTICIPANT}.csv")) == 20
+    assert not (tmp_path / ".collector_spool.jsonl").exists()
@@ -0,0 +1,32 @@
+# Hit testing on overlapping ring layouts
+import pytest
+
+from targets import TargetIndex, ring_positions, check_ring_layout
+
+RING_TARGETS = 13
+
+
+@pytest.mark.parametrize("size", [20, 40, 60])
+@pytest.mark.parametrize("distance", [100, 200, 300])
+def test_click_at_active_center_is_hit(size, distance):
+    positions = ring_positions((400, 300), distance, RING_TARGETS)
+    index = TargetIndex([(i, pos, size, 'ring') for i, pos in enumerate(positions)])
+    for active_id, pos in enumerate(positions):
+        assert index.classify(pos, active_id) == 'hit'
+
+
+def test_overlap_prefers_active_then_nearest():
+    index = TargetIndex([(0, (0, 0), 60, 'ring'), (1, (24, 0), 60, 'ring')])
+    assert index.classify((20, 0), 0) == 'hit'
+    assert index.classify((20, 0), 1) == 'hit'
+    assert index.hit((20, 0)) == 1
+    assert index.classify((-25, 0), 1) == 'wrong_target'
+    assert index.classify((100, 100), 0) == 'miss'
+
+
+def test_ring_layout_rejects_overlapping_targets():
+    check_ring_layout(60, 300, RING_TARGETS)
+    with pytest.raises(ValueError):
+        check_ring_layout(60, 100, RING_TARGETS)
+    with pytest.raises(ValueError):
+        check_ring_layout(40, 100, RING_TARGETS)
@@ -0,0 +1,234 @@
+# Compact, randomly accessible storage for raw mouse trajectories
+#
+# File layout (all integers little-endian):
+#   header   b'FTRJ' | version u8 | codec u8 | 2 reserved bytes
+#   blocks   one per trial: BLOCK_HEADER (starting b'FTRB') and the (compressed) payload
+#   index    one INDEX_DTYPE record per trial
+#   footer   index offset u64 | trial count u32 | b'FTRX'
+#
+# A block payload stores n samples column by column: time, x and y as deltas
+# from the first sample (int16, or int32 when a delta does not fit, flagged in
+# the block header), then one uint8 event code per sample. Times are kept in
+# units of 10 microseconds. Each block is compressed on its own, so any trial
+# can be read without touching the rest of the session. If the writer never
+# closed the file (e.g. a crash), the reader rebuilds the index by walking
+# the block headers.
+import lzma
+import mmap
+import zlib
+import struct
+import numpy as np
+
+MAGIC = b'FTRJ'
+BLOCK_MAGIC = b'FTRB'
+FOOTER_MAGIC = b'FTRX'
+VERSION = 1
+CODECS = {'none': 0, 'zlib': 1, 'lzma': 2}
+TIME_UNITS_PER_MS = 100
+EVENTS = ['move', 'hit', 'miss', 'wrong_target', 'distractor', 'start']
+
+FILE_HEADER = struct.Struct('<4sBB2x')
+# marker, trial, payload length, samples, flags, t0, x0, y0, target x, target y
+BLOCK_HEADER = struct.Struct('<4sIIIB3xiiiii')
+FOOTER = struct.Struct('<QI4s')
+FLAG_WIDE = 1
+
+INDEX_DTYPE = np.dtype([
+    ('trial', '<u4'), ('offset', '<u8'), ('length', '<u4'), ('samples', '<u4'),
+    ('flags', 'u1'), ('t0', '<i4'), ('x0', '<i4'), ('y0', '<i4'),
+    ('target_x', '<i4'), ('target_y', '<i4')
+])
+
+
+def _compress(payload, codec, level):
+    if codec == CODECS['zlib']:
+        return zlib.compress(payload, level)
+    if codec == CODECS['lzma']:
+        return lzma.compress(payload, preset=level)
+    return payload
+
+
+def _decompress(payload, codec):
+    if codec == CODECS['zlib']:
+        return zlib.decompress(payload)
+    if codec == CODECS['lzma']:
+        return lzma.decompress(payload)
+    return payload
+
+
+class TrajectoryWriter:
+    """Append trials to a trajectory file as they complete.
+
+    Parameters:
+        path (str): Output file
+        codec (str): 'zlib', 'lzma' or 'none'
+        level (int): Compression level (zlib level or lzma preset)
+    """
+    def __init__(self, path, codec='zlib', level=6):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}', expected one of {sorted(CODECS)}")
+        self.path = path
+        self.codec = CODECS[codec]
+        self.level = level
+        self._index = []
+        self._file = open(path, 'wb')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, self.codec))
+
+    def write_trial(self, trial, samples, target=(0, 0)):
+        """Encode and append one trial.
+
+        Parameters:
+            trial (int): Trial number
+            samples (list): (t_ms, x, y, event) tuples in time order
+            target (tuple): Target center (x, y) for the trial
+        """
+        n = len(samples)
+        t = np.fromiter((round(s[0] * TIME_UNITS_PER_MS) for s in samples), dtype=np.int64, count=n)
+        x = np.fromiter((s[1] for s in samples), dtype=np.int64, count=n)
+        y = np.fromiter((s[2] for s in samples), dtype=np.int64, count=n)
+        events = np.fromiter((EVENTS.index(s[3]) for s in samples), dtype=np.uint8, count=n)
+
+        first = (int(t[0]), int(x[0]), int(y[0])) if n else (0, 0, 0)
+        deltas = [np.diff(column) for column in (t, x, y)] if n else [np.empty(0, np.int64)] * 3
+        int16 = np.iinfo(np.int16)
+        wide = any(len(d) and (d.min() < int16.min or d.max() > int16.max) for d in deltas)
+        delta_dtype = '<i4' if wide else '<i2'
+        payload = b''.join([d.astype(delta_dtype).tobytes() for d in deltas] + [events.tobytes()])
+        payload = _compress(payload, self.codec, self.level)
+
+        offset = self._file.tell()
+        flags = FLAG_WIDE if wide else 0
+        self._file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, trial, len(payload), n, flags, *first,
+                                           int(target[0]), int(target[1])))
+        self._file.write(payload)
+        # Hand completed trials to the OS so a crash can only lose the trial in progress
+        self._file.flush()
+        self._index.append((trial, offset + BLOCK_HEADER.size, len(payload), n, flags,
+                            *first, int(target[0]), int(target[1])))
+
+    def close(self):
+        """Write the trial index and footer."""
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=INDEX_DTYPE).tobytes())
+        self._file.write(FOOTER.pack(index_offset, len(self._index), FOOTER_MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TrajectoryReader:
+    """Memory-mapped reader for trajectory files.
+
+    The index is a NumPy view straight onto the mapped file. A trial's
+    payload is read from the mapping (and inflated for compressed codecs)
+    without touching other blocks; the delta columns are then decoded into
+    new arrays, while the event codes view the payload buffer.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        header = self._file.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size or header[:4] != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a trajectory file")
+        magic, version, self.codec = FILE_HEADER.unpack(header)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if version != VERSION:
+            raise ValueError(f"Unsupported trajectory file version {version}")
+        self.index = self._read_index()
+        self._positions = {int(trial): i for i, trial in enumerate(self.index['trial'])}
+
+    def _read_index(self):
+        size = len(self._map)
+        if size >= FILE_HEADER.size + FOOTER.size:
+            index_offset, count, magic = FOOTER.unpack_from(self._map, size - FOOTER.size)
+            if magic == FOOTER_MAGIC:
+                return np.frombuffer(self._map, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        return self._scan_blocks()
+
+    def _scan_blocks(self):
+        """Rebuild the index of a file whose writer was not closed."""
+        records = []
+        offset = FILE_HEADER.size
+        size = len(self._map)
+        while offset + BLOCK_HEADER.size <= size:
+            marker, trial, length, n, flags, t0, x0, y0, tx, ty = \
+                BLOCK_HEADER.unpack_from(self._map, offset)
+            start = offset + BLOCK_HEADER.size
+            if marker != BLOCK_MAGIC or start + length > size:
+                break  # reached the (partial) index or a truncated final block
+            records.append((trial, start, length, n, flags, t0, x0, y0, tx, ty))
+            offset = start + length
+        return np.array(records, dtype=INDEX_DTYPE)
+
+    @property
+    def trials(self):
+        return self.index['trial']
+
+    def __len__(self):
+        return len(self.index)
+
+    def read_trial(self, trial):
+        """Decode one trial without touching any other block.
+
+        Returns:
+            dict: 't_ms' (float64), 'x', 'y' (int32), 'event' (uint8 codes
+                  into EVENTS), plus 'target' (x, y)
+        """
+        entry = self.index[self._positions[int(trial)]]
+        n = int(entry['samples'])
+        offset = int(entry['offset'])
+        payload = _decompress(memoryview(self._map)[offset:offset + int(entry['length'])], self.codec)
+
+        delta_dtype = np.dtype('<i4' if entry['flags'] & FLAG_WIDE else '<i2')
+        m = max(n - 1, 0)
+        columns = []
+        for i, first in enumerate((entry['t0'], entry['x0'], entry['y0'])):
+            deltas = np.frombuffer(payload, dtype=delta_dtype, count=m, offset=i * m * delta_dtype.itemsize)
+            column = np.empty(n, dtype=np.int64)
+            if n:
+                column[0] = first
+                np.cumsum(deltas, out=column[1:])
+                column[1:] += first
+            columns.append(column)
+        events = np.frombuffer(payload, dtype=np.uint8, count=n, offset=3 * m * delta_dtype.itemsize)
+
+        return {
+            't_ms': columns[0] / TIME_UNITS_PER_MS,
+            'x': columns[1].astype(np.int32),
+            'y': columns[2].astype(np.int32),
+            'event': events,
+            'target': (int(entry['target_x']), int(entry['target_y']))
+        }
+
+    def read_all(self):
+        """Decode every trial into flat column arrays (plus 'trial', 'target_x', 'target_y')."""
+        parts = [self.read_trial(trial) for trial in self.trials]
+        counts = self.index['samples'].astype(np.int64)
+        result = {key: np.concatenate([p[key] for p in parts]) if parts else np.empty(0)
+                  for key in ('t_ms', 'x', 'y', 'event')}
+        result['trial'] = np.repeat(self.index['trial'], counts)
+        result['target_x'] = np.repeat(self.index['target_x'], counts)
+        result['target_y'] = np.repeat(self.index['target_y'], counts)
+        return result
+
+    def close(self):
+        self.index = None
+        self._positions = {}
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # arrays returned to the caller still view the mapping
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()